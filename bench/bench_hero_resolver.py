@@ -0,0 +1,49 @@
+"""英雄名解析微基准：对比旧版线性扫描与索引解析器的单次查找耗时
+
+用法（在 AstrBot 环境中，于插件目录下执行）：
+    python -m bench.bench_hero_resolver
+    python -m bench.bench_hero_resolver --number 20000
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main as plugin_main  # noqa: E402
+
+# 命中首项 / 命中末项 / 英文key / 别名 / 拼音 / 未命中
+QUERIES = ["安娜", "朱诺", "widowmaker", "士兵", "yuanshi", "不存在的英雄"]
+
+
+def linear_search(hero_name: str) -> Optional[str]:
+    """旧版实现：逐项比较中文名与hero_key"""
+    hero_name_lower = hero_name.strip().lower()
+    for name, key in plugin_main.HERO_NAME_TO_KEY.items():
+        if name.lower() == hero_name_lower or key == hero_name_lower:
+            return key
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="英雄名解析微基准")
+    parser.add_argument("--number", type=int, default=100000, help="每个查询的重复次数")
+    args = parser.parse_args()
+
+    resolver = plugin_main.HERO_RESOLVER
+    print(f"{'查询':<14}{'线性扫描(ns)':>14}{'索引解析(ns)':>14}  结果")
+    for query in QUERIES:
+        old = timeit.timeit(lambda: linear_search(query), number=args.number) / args.number * 1e9
+        new = timeit.timeit(lambda: resolver.resolve(query), number=args.number) / args.number * 1e9
+        print(f"{query:<14}{old:>14.0f}{new:>14.0f}  {linear_search(query)} -> {resolver.resolve(query)}")
+
+    miss = "不存在的英雄"
+    number = max(args.number // 100, 1)
+    cost = timeit.timeit(lambda: resolver.suggest(miss), number=number) / number * 1e6
+    print(f"未命中候选（suggest）: {cost:.1f} µs/次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""渲染结果缓存基准：数据已缓存时，对比每条命令复用渲染结果与重新格式化的CPU耗时
+
+用法（在 AstrBot 环境中，于插件目录下执行）：
+    python -m bench.bench_render
+    python -m bench.bench_render --number 5000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main as plugin_main  # noqa: E402
+from bench.fake_event import FakeEvent  # noqa: E402
+from bench.mock_server import MockOverfast, start_server  # noqa: E402
+
+# (命令, 插件处理方法)
+COMMANDS = [
+    ("ow Player1#1001", "ow_stats_query"),
+    ("ow英雄 源氏 安娜 天使 Player1#1001", "ow_hero_stats"),
+    ("ow帮助", "ow_help"),
+]
+
+
+async def _cpu_per_command(plugin: Any, message: str, handler_name: str, number: int) -> float:
+    """执行number次命令，返回每次的CPU耗时（微秒）"""
+    handler = getattr(plugin, handler_name)
+    started = time.process_time()
+    for _ in range(number):
+        async for _ in handler(FakeEvent(message, "bench-user")):
+            pass
+    return (time.process_time() - started) / number * 1e6
+
+
+async def amain(args: argparse.Namespace):
+    mock = MockOverfast(latency=0.0, jitter=0.0)
+    runner, base_url = await start_server(mock)
+    plugin = plugin_main.OWStatsPlugin(context=None, config={
+        "api_base": base_url,
+        "persist_cache": False,
+        "admission_enabled": False,  # 同一用户反复执行命令，不经过命令准入限速
+        "history_enabled": False,
+    })
+    try:
+        # 预热：数据进入缓存，之后的命令不再请求上游
+        for message, handler_name in COMMANDS:
+            async for _ in getattr(plugin, handler_name)(FakeEvent(message, "bench-user")):
+                pass
+        print(f"{'命令':<40}{'重新渲染(µs)':>14}{'复用渲染(µs)':>14}")
+        for message, handler_name in COMMANDS:
+            reply_cache = plugin.reply_cache
+            plugin.reply_cache = plugin_main.LRUCache(max_entries=0)  # 容量为0：每次都重新渲染
+            uncached = await _cpu_per_command(plugin, message, handler_name, args.number)
+            plugin.reply_cache = reply_cache
+            cached = await _cpu_per_command(plugin, message, handler_name, args.number)
+            print(f"{message:<40}{uncached:>14.1f}{cached:>14.1f}")
+        print(f"上游调用次数: {mock.total_calls}")
+    finally:
+        await plugin.terminate()
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="渲染结果缓存基准")
+    parser.add_argument("--number", type=int, default=2000, help="每条命令的重复次数")
+    args = parser.parse_args()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            asyncio.run(amain(args))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
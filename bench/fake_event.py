@@ -0,0 +1,25 @@
+"""压测用的模拟消息事件（只实现插件用到的 AstrMessageEvent 接口）"""
+from typing import List
+
+
+class FakeEvent:
+    """模拟群聊消息事件，记录插件回复"""
+    def __init__(self, message: str, sender_id: str, group_id: str = "bench-group", admin: bool = False):
+        self.message_str = message
+        self._sender_id = sender_id
+        self._group_id = group_id
+        self._admin = admin
+        self.replies: List[str] = []
+
+    def get_sender_id(self) -> str:
+        return self._sender_id
+
+    def get_group_id(self) -> str:
+        return self._group_id
+
+    def is_admin(self) -> bool:
+        return self._admin
+
+    def plain_result(self, text: str) -> str:
+        self.replies.append(text)
+        return text
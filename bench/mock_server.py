@@ -0,0 +1,210 @@
+"""本地模拟 overfast-api 服务（可配置延迟与故障注入），用于离线压测"""
+import argparse
+import asyncio
+import hashlib
+import random
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+ROLES = ("tank", "damage", "support")
+DIVISIONS = ("bronze", "silver", "gold", "platinum", "diamond", "master", "grandmaster")
+HERO_KEYS = (
+    "ana", "ashe", "baptiste", "bastion", "brigitte", "cassidy", "doomfist", "dva", "echo", "freya",
+    "genji", "hanzo", "hazard", "illari", "junker-queen", "junkrat", "juno", "kiriko", "lifeweaver",
+    "lucio", "mauga", "mei", "mercy", "moira", "orisa", "pharah", "ramattra", "reaper", "reinhardt",
+    "roadhog", "sigma", "sojourn", "soldier-76", "sombra", "symmetra", "torbjorn", "tracer",
+    "venture", "widowmaker", "winston", "wrecking-ball", "wuyang", "zarya", "zenyatta",
+)
+
+
+def _rng(*parts: str) -> random.Random:
+    """按玩家标签生成确定性随机数，保证同一玩家多次请求数据一致"""
+    seed = hashlib.md5("|".join(parts).encode("utf-8")).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+def make_summary(player_id: str) -> Dict[str, Any]:
+    """玩家概要（结构与 /players/{id}/summary 一致）"""
+    rng = _rng(player_id, "summary")
+
+    def role() -> Optional[Dict[str, Any]]:
+        if rng.random() < 0.15:
+            return None
+        division = rng.choice(DIVISIONS)
+        return {
+            "division": division, "tier": rng.randint(1, 5),
+            "role_icon": f"https://static.example/{division}-role.svg",
+            "rank_icon": f"https://static.example/{division}-rank.png",
+            "tier_icon": f"https://static.example/{division}-tier.png",
+        }
+
+    def platform() -> Dict[str, Any]:
+        return {"season": rng.randint(10, 20), **{r: role() for r in ROLES}}
+
+    return {
+        "username": player_id.split("-")[0],
+        "avatar": f"https://static.example/avatar/{player_id}.png",
+        "namecard": f"https://static.example/namecard/{player_id}.png",
+        "title": "Hero",
+        "endorsement": {"level": rng.randint(1, 5), "frame": "https://static.example/endorsement.svg"},
+        "competitive": {"pc": platform(), "console": platform() if rng.random() < 0.3 else None},
+        "last_updated_at": 1700000000 + rng.randint(0, 10 ** 6),
+    }
+
+
+def make_stats_summary(player_id: str, gamemode: str) -> Dict[str, Any]:
+    """模式统计（结构与 /players/{id}/stats/summary 一致）"""
+    rng = _rng(player_id, "stats", gamemode)
+
+    def block() -> Dict[str, Any]:
+        played = rng.randint(0, 800)
+        won = rng.randint(0, played)
+        return {
+            "games_played": played, "games_won": won, "games_lost": played - won,
+            "time_played": played * rng.randint(500, 900), "winrate": round(won / played * 100, 2) if played else 0,
+            "kda": round(rng.uniform(1, 6), 2),
+            "total": {k: rng.randint(0, 10 ** 6) for k in ("eliminations", "assists", "deaths", "damage", "healing")},
+            "average": {k: round(rng.uniform(0, 12000 if k in ("damage", "healing") else 30), 2)
+                        for k in ("eliminations", "assists", "deaths", "damage", "healing")},
+        }
+
+    return {
+        "general": block(),
+        "roles": {r: block() for r in ROLES},
+        "heroes": {h: block() for h in rng.sample(HERO_KEYS, 15)},
+    }
+
+
+def make_career(player_id: str, gamemode: str) -> Dict[str, Any]:
+    """生涯数据（结构与 /players/{id}/stats/career 一致，含大量格式化用不到的字段）"""
+    rng = _rng(player_id, "career", gamemode)
+
+    def hero() -> Dict[str, Any]:
+        played = rng.randint(0, 200)
+        return {
+            "game": {"games_played": played, "games_won": rng.randint(0, played), "games_lost": 0,
+                     "time_played": played * 600, "hero_wins": 0},
+            "combat": {"eliminations": rng.randint(0, 5000), "hero_damage_done": rng.randint(0, 10 ** 6),
+                       "deaths": rng.randint(0, 3000), "final_blows": rng.randint(0, 3000),
+                       **{f"combat_extra_{i}": rng.randint(0, 1000) for i in range(12)}},
+            "average": {"eliminations_avg_per_10_min": rng.uniform(0, 30),
+                        "hero_damage_done_avg_per_10_min": rng.uniform(0, 12000),
+                        "deaths_avg_per_10_min": rng.uniform(0, 12),
+                        "final_blows_avg_per_10_min": rng.uniform(0, 15),
+                        **{f"average_extra_{i}": rng.uniform(0, 100) for i in range(15)}},
+            "best": {"eliminations_most_in_game": rng.randint(0, 60), "kill_streak_best": rng.randint(0, 30),
+                     "hero_damage_done_most_in_game": rng.randint(0, 40000), "multikill_best": rng.randint(0, 6),
+                     **{f"best_extra_{i}": rng.randint(0, 100) for i in range(10)}},
+            "hero_specific": {f"specific_{i}": rng.randint(0, 10000) for i in range(12)},
+            "assists": {f"assists_{i}": rng.randint(0, 10000) for i in range(6)},
+            "match_awards": {f"award_{i}": rng.randint(0, 100) for i in range(4)},
+        }
+
+    return {"all-heroes": hero(), **{h: hero() for h in HERO_KEYS}}
+
+
+def make_heroes(locale: str) -> List[Dict[str, Any]]:
+    """英雄列表（结构与 /heroes 一致，含格式化用不到的头像与职责字段）"""
+    roles = ("tank", "damage", "support")
+    return [
+        {"key": key, "name": key.replace("-", " ").title(), "portrait": f"https://example.invalid/{locale}/{key}.png",
+         "role": roles[i % len(roles)]}
+        for i, key in enumerate(HERO_KEYS)
+    ]
+
+
+class MockOverfast:
+    """模拟服务：统计请求次数，按概率注入延迟、429、500与超时"""
+    def __init__(self, latency: float = 0.3, jitter: float = 0.1, p429: float = 0.0, p500: float = 0.0,
+                 ptimeout: float = 0.0, timeout_delay: float = 90.0, seed: int = 7):
+        self.latency = latency
+        self.jitter = jitter
+        self.p429 = p429
+        self.p500 = p500
+        self.ptimeout = ptimeout
+        self.timeout_delay = timeout_delay
+        self.random = random.Random(seed)
+        self.calls: Dict[str, int] = {}
+        self.status_counts: Dict[int, int] = {}
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def reset(self):
+        self.calls.clear()
+        self.status_counts.clear()
+
+    async def _respond(self, request: web.Request, payload_factory) -> web.StreamResponse:
+        endpoint = request.match_info.get("endpoint") or request.path
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        roll = self.random.random()
+        if roll < self.ptimeout:
+            await asyncio.sleep(self.timeout_delay)
+        await asyncio.sleep(max(0.0, self.random.gauss(self.latency, self.jitter)))
+        if roll < self.ptimeout + self.p429:
+            return self._status(web.json_response({"error": "rate limited"}, status=429, headers={"Retry-After": "1"}))
+        if roll < self.ptimeout + self.p429 + self.p500:
+            return self._status(web.json_response({"error": "internal error"}, status=500))
+        player_id = request.match_info.get("player_id", "")
+        if player_id.lower().startswith("missing"):
+            return self._status(web.json_response({"error": "Player not found"}, status=404))
+        payload = payload_factory(player_id, request.query.get("gamemode", "quickplay"))
+        return self._status(web.json_response(payload, headers={"Cache-Control": "public, max-age=600"}))
+
+    def _status(self, resp: web.Response) -> web.Response:
+        self.status_counts[resp.status] = self.status_counts.get(resp.status, 0) + 1
+        return resp
+
+    async def summary(self, request: web.Request) -> web.StreamResponse:
+        return await self._respond(request, lambda pid, _: make_summary(pid))
+
+    async def stats_summary(self, request: web.Request) -> web.StreamResponse:
+        return await self._respond(request, make_stats_summary)
+
+    async def career(self, request: web.Request) -> web.StreamResponse:
+        return await self._respond(request, make_career)
+
+    async def heroes(self, request: web.Request) -> web.StreamResponse:
+        return await self._respond(request, lambda *_: make_heroes(request.query.get("locale", "en-us")))
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"calls": self.calls, "status_counts": self.status_counts})
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/players/{player_id}/summary", self.summary)
+        app.router.add_get("/players/{player_id}/stats/summary", self.stats_summary)
+        app.router.add_get("/players/{player_id}/stats/career", self.career)
+        app.router.add_get("/heroes", self.heroes)
+        app.router.add_get("/_stats", self.stats)
+        return app
+
+
+async def start_server(mock: MockOverfast, host: str = "127.0.0.1", port: int = 0) -> "tuple[web.AppRunner, str]":
+    """启动模拟服务，返回 (runner, base_url)"""
+    runner = web.AppRunner(mock.make_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟 overfast-api 服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.3, help="平均响应延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.1, help="延迟标准差（秒）")
+    parser.add_argument("--p429", type=float, default=0.0, help="429 注入概率")
+    parser.add_argument("--p500", type=float, default=0.0, help="500 注入概率")
+    parser.add_argument("--ptimeout", type=float, default=0.0, help="超时注入概率")
+    args = parser.parse_args()
+    mock = MockOverfast(args.latency, args.jitter, args.p429, args.p500, args.ptimeout)
+    web.run_app(mock.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""离线压测：用本地模拟 overfast-api 回放群聊突发查询，统计命令延迟、上游调用数与内存
+
+用法（在 AstrBot 环境中，于插件目录下执行）：
+    python -m bench.run_bench
+    python -m bench.run_bench --scenario hot_tag --latency 0.5 --p500 0.05 --output after.json --baseline before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main as plugin_main  # noqa: E402
+from bench.fake_event import FakeEvent  # noqa: E402
+from bench.mock_server import MockOverfast, start_server  # noqa: E402
+
+# 命令前缀 -> 插件处理方法（按前缀长度从长到短匹配）
+COMMANDS = [
+    ("ow英雄", "ow_hero_stats"),
+    ("ow排行", "ow_leaderboard"),
+    ("ow", "ow_stats_query"),
+]
+HERO_NAMES = ["源氏", "安娜", "天使", "猎空", "莱因哈特", "雾子", "D.Va", "卢西奥"]
+
+
+def _tags(n: int) -> List[str]:
+    return [f"Player{i}#{1000 + i}" for i in range(n)]
+
+
+def scenario_group_burst(rng: random.Random) -> List[Tuple[float, str, str]]:
+    """群聊突发：40 条命令在 3 秒内到达，涉及 10 个玩家，约 70% /ow、30% /ow英雄"""
+    tags = _tags(10)
+    events = []
+    for i in range(40):
+        tag = rng.choice(tags)
+        if rng.random() < 0.7:
+            msg = f"ow {tag}"
+        else:
+            msg = f"ow英雄 {' '.join(rng.sample(HERO_NAMES, rng.randint(1, 3)))} {tag}"
+        events.append((rng.uniform(0, 3), msg, f"user{i % 15}"))
+    return events
+
+
+def scenario_hot_tag(rng: random.Random) -> List[Tuple[float, str, str]]:
+    """热门玩家：30 名群友在 1 秒内查询同一玩家"""
+    return [(rng.uniform(0, 1), "ow Hot#2217", f"user{i}") for i in range(30)]
+
+
+def scenario_cold_warm(rng: random.Random) -> List[Tuple[float, str, str]]:
+    """冷启动后复查：15 个玩家各查询一次，40 秒后全部复查一次"""
+    tags = _tags(15)
+    first = [(rng.uniform(0, 2), f"ow {t}", f"user{i}") for i, t in enumerate(tags)]
+    second = [(40 + rng.uniform(0, 2), f"ow {t}", f"user{i}") for i, t in enumerate(tags)]
+    return first + second
+
+
+SCENARIOS = {
+    "group_burst": scenario_group_burst,
+    "hot_tag": scenario_hot_tag,
+    "cold_warm": scenario_cold_warm,
+}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+async def _run_event(plugin: Any, at: float, message: str, sender: str, started: float) -> Tuple[float, bool]:
+    """在指定时间点投递一条命令，返回 (端到端耗时, 是否失败)"""
+    await asyncio.sleep(max(0.0, started + at - time.monotonic()))
+    event = FakeEvent(message, sender)
+    handler_name = next(name for prefix, name in COMMANDS if message.startswith(prefix))
+    t0 = time.monotonic()
+    async for _ in getattr(plugin, handler_name)(event):
+        pass
+    failed = any(r.startswith("❌") or "超时" in r for r in event.replies[1:])
+    return time.monotonic() - t0, failed
+
+
+async def run_scenario(name: str, mock: MockOverfast, base_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """运行单个场景（每个场景使用全新的插件实例与缓存）"""
+    mock.reset()
+    plugin = plugin_main.OWStatsPlugin(context=None, config={
+        "api_base": base_url,
+        "persist_cache": False,
+        "admission_enabled": False,  # 压测回放的是突发流量本身，不经过命令准入限速
+        "rate_limit": args.rate,
+        "rate_burst": args.burst,
+    })
+    events = SCENARIOS[name](random.Random(args.seed))
+    tracemalloc.start()
+    started = time.monotonic()
+    results = await asyncio.gather(*[_run_event(plugin, at, msg, sender, started) for at, msg, sender in events])
+    wall = time.monotonic() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cache_bytes = plugin.client.cache.stats()["bytes"]
+    await plugin.terminate()
+
+    latencies = [r[0] for r in results]
+    return {
+        "scenario": name,
+        "commands": len(results),
+        "failed": sum(1 for r in results if r[1]),
+        "p50": _percentile(latencies, 0.5),
+        "p90": _percentile(latencies, 0.9),
+        "p99": _percentile(latencies, 0.99),
+        "max": max(latencies) if latencies else 0.0,
+        "wall_seconds": wall,
+        "upstream_calls": mock.total_calls,
+        "upstream_status": {str(k): v for k, v in sorted(mock.status_counts.items())},
+        "peak_memory_kb": peak / 1024,
+        "cache_kb": cache_bytes / 1024,
+    }
+
+
+def print_report(results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]):
+    """打印结果表（提供基线时附带变化量）"""
+    fields = ["commands", "failed", "p50", "p90", "p99", "max", "upstream_calls", "peak_memory_kb", "cache_kb"]
+    for result in results:
+        print(f"\n== {result['scenario']} ==")
+        base = baseline.get(result["scenario"], {})
+        for field in fields:
+            value = result[field]
+            line = f"  {field:<16}{value:>12.3f}" if isinstance(value, float) else f"  {field:<16}{value:>12}"
+            if field in base:
+                line += f"   (基线 {base[field]:.3f}, 变化 {value - base[field]:+.3f})"
+            print(line)
+        print(f"  upstream_status {result['upstream_status']}")
+
+
+async def amain(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    mock = MockOverfast(args.latency, args.jitter, args.p429, args.p500, args.ptimeout, seed=args.seed)
+    runner, base_url = await start_server(mock)
+    try:
+        names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+        return [await run_scenario(name, mock, base_url, args) for name in names]
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OW 插件离线压测")
+    parser.add_argument("--scenario", default="all", choices=["all", *SCENARIOS])
+    parser.add_argument("--latency", type=float, default=0.3, help="模拟上游平均延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.1, help="模拟上游延迟标准差（秒）")
+    parser.add_argument("--p429", type=float, default=0.0, help="429 注入概率")
+    parser.add_argument("--p500", type=float, default=0.0, help="500 注入概率")
+    parser.add_argument("--ptimeout", type=float, default=0.0, help="超时注入概率")
+    parser.add_argument("--rate", type=float, default=plugin_main.RATE_LIMIT, help="插件限流速率（次/秒）")
+    parser.add_argument("--burst", type=int, default=plugin_main.RATE_BURST, help="插件限流突发数")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="结果写入的 JSON 文件")
+    parser.add_argument("--baseline", help="用于对比的历史结果 JSON 文件")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        baseline = {r["scenario"]: r for r in json.loads(Path(args.baseline).read_text(encoding="utf-8"))}
+
+    # 插件会在工作目录下写 data/，压测在临时目录中进行
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            results = asyncio.run(amain(args))
+        finally:
+            os.chdir(cwd)
+
+    print_report(results, baseline)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,32 @@ from astrbot.api.star import Star, register
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.event.filter import PermissionType
 from astrbot.api import logger
+import abc
 import aiohttp
 import asyncio
+import bisect
+import functools
+import heapq
 import json
+import os
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+import re
+import sqlite3
+import sys
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Set, Tuple
+from urllib.parse import urlparse
 import time
 from astrbot.api.message_components import Plain
 
 # ---------- 常量定义 ----------
 OW_API = "https://overfast-api.tekrop.fr"
+# 上游限流（overfast-api 公共实例约每秒1次，可突发3次；自建实例可在配置中放宽）
+RATE_LIMIT = 1.0
+RATE_BURST = 3
 # 段位分数范围映射
 DIVISION_SCORE = {
     "bronze": "1-1499", "silver": "1500-1999", "gold": "2000-2499",
@@ -26,12 +42,107 @@ DIVISION_CN = {
     "platinum": "白金", "diamond": "钻石", "master": "大师",
     "grandmaster": "宗师"
 }
-# 缓存TTL配置（秒）
+# 缓存TTL配置（秒）：(软TTL, 硬TTL)
+# 软TTL内直接返回；软硬TTL之间先返回旧数据并后台刷新；超过硬TTL删除
 CACHE_TTL = {
-    "summary": 600,    # 玩家概要：10分钟
-    "comp_summary": 600,# 竞技统计：10分钟
-    "qp_summary": 600, # 快速（休闲）统计：10分钟
-    "hero_stats": 3600 # 英雄数据：1小时
+    "summary": (600, 3600),       # 玩家概要：10分钟 / 1小时
+    "comp_summary": (600, 3600),  # 竞技统计：10分钟 / 1小时
+    "qp_summary": (600, 3600),    # 快速（休闲）统计：10分钟 / 1小时
+    "hero_stats": (3600, 21600),  # 英雄数据：1小时 / 6小时
+    "heroes": (86400, 2592000)    # 英雄目录：1天 / 30天（离线时尽量沿用旧目录）
+}
+# 上游缓存头（Cache-Control/Expires）覆盖TTL时的最小软TTL（秒）
+UPSTREAM_TTL_MIN = 30
+# 响应压缩：安装brotli后额外协商br编码
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+# 负缓存：404等确定性失败短期缓存，避免重复请求打错/未公开的标签
+NEGATIVE_CACHE_TTL = 120            # 负缓存有效期（秒）
+NEGATIVE_CACHE_MAX_ENTRIES = 1000   # 负缓存最大条目数
+NEGATIVE_CACHE_STATUS = {400, 404, 422}
+# 缓存容量上限（超出后按LRU淘汰）
+CACHE_MAX_ENTRIES = 2000            # 最大条目数
+CACHE_MAX_BYTES = 32 * 1024 * 1024  # 最大占用（估算字节）
+# 持久化缓存（SQLite，插件重载后仍可复用）
+DISK_CACHE_FILE = "data/ow_stats_cache.db"
+DISK_CACHE_FLUSH_INTERVAL = 2.0  # 批量落盘间隔（秒）
+# 战绩历史（每次成功获取的概要/模式数据追加为快照，数据未变化时不重复记录）
+HISTORY_FILE = "data/ow_stats_history.db"
+HISTORY_FLUSH_INTERVAL = 5.0     # 批量落盘间隔（秒）
+TREND_DEFAULT_DAYS = 7           # /ow趋势 默认统计天数
+TREND_MAX_DAYS = 90              # /ow趋势 最多统计天数
+TREND_BASELINE_TOLERANCE = 86400 # 基线快照早于窗口起点超过该秒数时，在报告中注明实际起算日期
+HISTORY_RETENTION_DAYS = 365     # 历史快照保留天数（每组保留一条更早的快照作为基线）
+HISTORY_SWEEP_INTERVAL = 3600    # 过期快照清理间隔（秒）
+# 绑定数据落盘合并延迟（秒），短时间内的多次修改只写一次
+BIND_FLUSH_DELAY = 1.0
+# 熔断器：统计窗口内错误率（慢调用计为失败）过高时暂停请求上游
+BREAKER_WINDOW = 60.0        # 统计窗口（秒）
+BREAKER_MIN_REQUESTS = 5     # 窗口内最少请求数，低于该值不判定熔断
+BREAKER_ERROR_RATE = 0.5     # 触发熔断的错误率
+BREAKER_SLOW_CALL = 20.0     # 慢调用阈值（秒）
+BREAKER_OPEN_SECONDS = 30.0  # 熔断持续时间（秒），之后放行一个探测请求
+BREAKER_UNAVAILABLE_MSG = "数据服务暂时不可用（已触发熔断保护），请稍后重试"
+# 重试预算：窗口内重试次数不超过主请求数的一定比例
+RETRY_BUDGET_RATIO = 0.2
+RETRY_BUDGET_MIN = 3         # 窗口内至少允许的重试次数
+# 后台预取（默认关闭）：在缓存过期前刷新近期活跃的已绑定账号
+PREFETCH_INTERVAL = 120       # 预取轮询间隔（秒）
+PREFETCH_RECENCY_HOURS = 24   # 仅预取该时间内查询过的账号
+PREFETCH_BUDGET = 10          # 每轮最多发起的上游请求数
+PREFETCH_LEAD = 120           # 软TTL剩余不足该秒数时预取
+# 命令准入控制：按发送者/群的令牌桶限速，并限制每人未完成的查询数，超限立即拒绝
+ADMISSION_USER_RATE = 6        # 每人每分钟可发起的查询数
+ADMISSION_USER_BURST = 3       # 每人突发查询数
+ADMISSION_GROUP_RATE = 30      # 每群每分钟可发起的查询数
+ADMISSION_GROUP_BURST = 10     # 每群突发查询数
+ADMISSION_MAX_INFLIGHT = 2     # 每人同时未完成的查询数上限
+ADMISSION_MAX_KEYS = 5000      # 令牌桶最多跟踪的发送者/群数量（超出按LRU淘汰）
+# 截止时间传递：每次尝试最多等到请求的截止时间（合并的调用方可延长），剩余不足该值时不再发起新尝试（秒）
+ATTEMPT_MIN_TIMEOUT = 1.0
+# 对冲请求（默认关闭）：首个请求超过该接口观测p95仍未返回时，在有空闲令牌时补发一个
+HEDGE_MIN_SAMPLES = 20         # 接口样本数达到该值后才启用对冲
+HEDGE_MIN_DELAY = 0.5          # 对冲触发延迟下限（秒）
+HEDGE_RESERVE = 1              # 对冲请求取令牌后至少保留的令牌数（留给交互查询）
+# 被动健康统计：按近期上游调用结果评估API状态，/ow状态 不再实时请求
+HEALTH_WINDOW = 300            # 统计窗口（秒）
+HEALTH_MAX_SAMPLES = 500       # 窗口内最多保留的样本数
+HEALTH_PROBE_INTERVAL = 300    # 后台探测间隔（秒），期间已有上游调用时跳过；0为关闭
+HEALTH_PROBE_TIMEOUT = 15      # 探测请求超时（秒）
+HEALTH_PROBE_TAG = "TeKrop-2217"
+# 运行指标：延迟直方图分桶（秒）与导出配置
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 60.0)
+METRICS_DUMP_INTERVAL = 60  # 指标文件导出间隔（秒）
+# 上游请求优先级（数值越小越优先）
+PRIORITY_INTERACTIVE = 0  # 用户交互查询
+PRIORITY_BACKGROUND = 1   # 后台刷新/预取/探测
+BACKGROUND_SHARE = 0.3    # 后台任务在统计窗口内可占用的令牌比例上限
+BACKGROUND_RESERVE = 1    # 后台任务取令牌后桶内至少保留的令牌数（留给交互查询）
+# 缓存字段裁剪规则：只保留格式化时会读取的字段（None表示保留该字段原值，"*"匹配任意键）
+_ROLE_FIELDS = {"division": None, "tier": None, "season": None}
+_PLATFORM_FIELDS = {"season": None, "tank": _ROLE_FIELDS, "damage": _ROLE_FIELDS, "support": _ROLE_FIELDS}
+PROJECTION = {
+    "summary": {"competitive": {"pc": _PLATFORM_FIELDS, "console": _PLATFORM_FIELDS}},
+    "mode_summary": {"general": {
+        "games_played": None, "games_won": None, "kda": None,
+        "average": {"eliminations": None, "deaths": None, "damage": None, "healing": None},
+    }},
+    "heroes": {"key": None, "name": None},
+    "career": {"*": {
+        "game": {"games_played": None, "games_won": None},
+        "combat": {"eliminations": None, "hero_damage_done": None, "deaths": None, "final_blows": None},
+        "average": {
+            "eliminations_avg_per_10_min": None, "hero_damage_done_avg_per_10_min": None,
+            "deaths_avg_per_10_min": None, "final_blows_avg_per_10_min": None,
+        },
+        "best": {
+            "eliminations_most_in_game": None, "kill_streak_best": None,
+            "hero_damage_done_most_in_game": None, "multikill_best": None,
+        },
+    }},
 }
 # 英雄名-Key映射（扩展可支持更多英雄）
 HERO_NAME_TO_KEY = {
@@ -49,6 +160,59 @@ HERO_NAME_TO_KEY = {
     "秩序之光": "symmetra","索杰恩": "sojourn","骇灾": "hazard","无漾": "wuyang",
     "弗蕾娅": "freya","朱诺": "juno"
 }
+# 英雄别名/昵称（用于模糊查找）
+HERO_ALIASES = {
+    "soldier-76": ["士兵", "76", "大兵", "soldier", "s76"], "dva": ["宋哈娜", "哈娜", "dva"],
+    "cassidy": ["卡西迪", "牛仔", "mccree"], "widowmaker": ["寡妇", "widow"],
+    "torbjorn": ["托比", "torb"], "wrecking-ball": ["仓鼠", "哈蒙德", "球", "hammond"],
+    "reinhardt": ["大锤", "莱茵", "rein"], "mercy": ["奶妈"], "lucio": ["dj"],
+    "zenyatta": ["禅", "和尚", "zen"], "symmetra": ["秩序", "sym"], "pharah": ["法鸡", "法老"],
+    "orisa": ["人马"], "brigitte": ["小锤", "布丽吉塔", "brig"], "baptiste": ["巴蒂", "bap"],
+    "mei": ["小美"], "junker-queen": ["女王", "jq"], "doomfist": ["铁拳", "doom"],
+    "zarya": ["毛妹"], "winston": ["猩猩"], "junkrat": ["炸弹鼠"], "roadhog": ["猪", "hog"],
+    "lifeweaver": ["花男", "lw"], "ramattra": ["拉马刹"], "wuyang": ["乌漾"],
+}
+# 英雄中文名拼音（空格分隔音节，用于全拼/首字母查找）
+HERO_PINYIN = {
+    "genji": "yuan shi", "cassidy": "mai ke lei", "soldier-76": "shi bing 76", "pharah": "fa lao zhi ying",
+    "reaper": "si shen", "tracer": "lie kong", "winston": "wen si dun", "zarya": "cha li ya",
+    "reinhardt": "lai yin ha te", "ana": "an na", "mercy": "tian shi", "lucio": "lu xi ao",
+    "hanzo": "ban zang", "junkrat": "kuang shu", "roadhog": "lu ba", "orisa": "ao li sha",
+    "sigma": "xi ge ma", "brigitte": "bu li ji ta", "moira": "mo yi la", "baptiste": "ba di si te",
+    "sombra": "hei ying", "torbjorn": "tuo bi ang", "bastion": "bao lei", "mei": "mei", "ashe": "ai shi",
+    "wrecking-ball": "po huai qiu", "zenyatta": "chan ya ta", "echo": "hui sheng",
+    "junker-queen": "zha ke nv wang", "kiriko": "wu zi", "ramattra": "la ma cha",
+    "lifeweaver": "sheng ming zhi suo", "illari": "yi la rui", "mauga": "mao jia", "venture": "tan qi",
+    "widowmaker": "hei bai he", "doomfist": "mo ri tie quan", "symmetra": "zhi xu zhi guang",
+    "sojourn": "suo jie en", "hazard": "hai zai", "wuyang": "wu yang", "freya": "fu lei ya", "juno": "zhu nuo",
+}
+# 英雄目录：从API拉取的多语言英雄列表（内置映射作为离线兜底）
+HERO_CATALOG_LOCALES = ("zh-tw", "en-us")  # 优先使用的显示名语言在前
+HERO_CATALOG_WAIT = 3.0                    # 查询未命中时等待目录加载的最长时间（秒）
+HERO_CATALOG_RETRY = 300                   # 目录加载失败后的重试间隔（秒）
+# 连接池默认配置（可在插件配置中覆盖）
+POOL_LIMIT = 20            # 连接池总连接数上限
+POOL_LIMIT_PER_HOST = 10   # 单主机连接数上限
+KEEPALIVE_TIMEOUT = 30     # 空闲连接保活时间（秒）
+DNS_CACHE_TTL = 300        # DNS缓存时间（秒）
+# /ow 汇总查询的共享截止时间（秒），超时未返回的数据块标记为缺失
+QUERY_DEADLINE = 45
+SECTION_TIMEOUT_MSG = "数据获取超时，本次未能返回"
+# 单次英雄查询最多支持的英雄数
+MAX_HEROES_PER_QUERY = 5
+# 渲染结果缓存：按(命令, 玩家, 参数, 数据版本)缓存最终回复文本，数据版本变化即失效
+REPLY_CACHE_MAX_ENTRIES = 500
+REPLY_CACHE_TTL = 21600            # 与数据缓存最长硬TTL一致（秒）
+# /ow排行 批量查询
+LEADERBOARD_MAX_TAGS = 30          # 单次排行最多查询的玩家数
+LEADERBOARD_CONCURRENCY = 4        # 同时进行的概要请求数（仍受全局限流约束）
+LEADERBOARD_DEADLINE = 90          # 排行查询截止时间（秒）
+LEADERBOARD_PROGRESS_STEP = 10     # 玩家数超过该值时，每完成这么多个推送一次进度
+LEADERBOARD_ADMISSION_COST = 3     # 排行命令消耗的准入令牌数（一次排行会发起多个请求）
+# 角色名称（含别名）-> 角色key
+ROLE_CN_TO_EN = {"坦克": "tank", "输出": "damage", "支援": "support", "辅助": "support"}
+# 段位高低顺序（用于排行）
+DIVISION_ORDER = {div: i for i, div in enumerate(DIVISION_SCORE)}
 # 模式映射（默认休闲）
 MODE_CN_TO_EN = {"竞技": "competitive", "休闲": "quickplay"}
 MODE_EN_TO_CN = {"competitive": "竞技", "quickplay": "休闲"}
@@ -56,142 +220,1490 @@ DEFAULT_MODE = "quickplay"  # 默认模式：休闲
 DEFAULT_MODE_CN = "休闲"    # 默认模式中文显示
 
 # ---------- 工具类 ----------
-class TimedCache:
-    """带TTL的缓存类"""
-    def __init__(self):
-        self._data: Dict[str, tuple] = {}
+def project_fields(data: Any, spec: Optional[Dict[str, Any]]) -> Any:
+    """按裁剪规则提取字段，返回与原数据结构相同的精简副本"""
+    if isinstance(data, list):
+        return [project_fields(item, spec) for item in data]
+    if spec is None or not isinstance(data, dict):
+        return data
+    result = {}
+    for key, sub_spec in spec.items():
+        if key == "*":
+            for data_key, value in data.items():
+                result[data_key] = project_fields(value, sub_spec)
+        elif key in data:
+            result[key] = project_fields(data[key], sub_spec)
+    return result
+
+class HeroResolver:
+    """英雄名解析器：导入时构建精确/别名/拼音/前缀索引，查找为常数时间，未命中时按编辑距离给出候选"""
+    _STRIP_CHARS = str.maketrans("", "", " .-_·:：'’")
+
+    def __init__(self, name_to_key: Dict[str, str], aliases: Dict[str, List[str]], pinyin: Dict[str, str]):
+        self.display_names: Dict[str, str] = {}   # hero_key -> 中文显示名
+        self._exact: Dict[str, Set[str]] = {}     # 规范化名称 -> hero_key集合
+        self._prefix: Dict[str, str] = {}         # 唯一前缀 -> hero_key
+        for name, key in name_to_key.items():
+            self.display_names.setdefault(key, name)
+            self.add(key, [name, key])
+        for key, names in aliases.items():
+            self.add(key, names)
+        for key, syllables in pinyin.items():
+            parts = syllables.split()
+            names = ["".join(parts)]
+            # 单音节名称的首字母只有一个字母，歧义过大，不登记
+            if sum(1 for p in parts if not p.isdigit()) > 1:
+                names.append("".join(p[0] for p in parts if not p.isdigit()) + "".join(p for p in parts if p.isdigit()))
+            self.add(key, names)
+        self._build_prefix()
+
+    @classmethod
+    def normalize(cls, name: str) -> str:
+        """规范化名称：去空白与标点、转小写"""
+        return name.strip().lower().translate(cls._STRIP_CHARS)
+
+    def add(self, key: str, names: List[str]):
+        """登记英雄的若干名称（批量登记后需调用_build_prefix）"""
+        self.display_names.setdefault(key, names[0] if names else key)
+        for name in names:
+            term = self.normalize(name)
+            if term:
+                self._exact.setdefault(term, set()).add(key)
+
+    def merge_catalog(self, catalog: Dict[str, List[str]]) -> int:
+        """合并API英雄目录（hero_key -> 各语言名称），返回新增的英雄数"""
+        added = sum(1 for key in catalog if key not in self.display_names)
+        for key, names in catalog.items():
+            self.add(key, names + [key])
+        self._build_prefix()
+        return added
+
+    def _build_prefix(self):
+        """构建唯一前缀索引（前缀只对应一个英雄时才可直接命中；拉丁字母前缀至少2个字符）"""
+        candidates: Dict[str, Set[str]] = {}
+        for term, keys in self._exact.items():
+            for i in range(2 if term.isascii() else 1, len(term)):
+                candidates.setdefault(term[:i], set()).update(keys)
+        self._prefix = {p: next(iter(keys)) for p, keys in candidates.items() if len(keys) == 1}
+
+    def resolve(self, name: str) -> Optional[str]:
+        """解析英雄名，返回hero_key（有歧义或未找到时返回None）"""
+        # 快速路径：索引键均已规范化，原样或仅转小写即可命中时跳过较慢的translate
+        keys = self._exact.get(name)
+        if keys is None:
+            term = name.lower()
+            keys = self._exact.get(term)
+            if keys is None:
+                key = self._prefix.get(term)
+                if key is not None:
+                    return key
+                term = self.normalize(name)
+                keys = self._exact.get(term)
+                if keys is None:
+                    return self._prefix.get(term)
+        return next(iter(keys)) if len(keys) == 1 else None
+
+    def suggest(self, name: str, limit: int = 3) -> List[str]:
+        """按编辑距离给出最接近的英雄中文名（仅在未命中时调用）"""
+        term = self.normalize(name)
+        if not term:
+            return []
+        scored: Dict[str, float] = {}
+        for candidate, keys in self._exact.items():
+            # 前缀有歧义时也作为候选
+            dist = 0 if candidate.startswith(term) else self._edit_distance(term, candidate) / max(len(candidate), len(term))
+            for key in keys:
+                if dist < scored.get(key, 1.0):
+                    scored[key] = dist
+        ranked = sorted((d, k) for k, d in scored.items() if d <= 0.5)
+        return [self.display_names[k] for _, k in ranked[:limit]]
+
+    @staticmethod
+    def _edit_distance(a: str, b: str) -> int:
+        """Levenshtein编辑距离"""
+        prev = list(range(len(b) + 1))
+        for i, ca in enumerate(a, 1):
+            cur = [i]
+            for j, cb in enumerate(b, 1):
+                cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+            prev = cur
+        return prev[-1]
+
+    def __len__(self) -> int:
+        return len(self.display_names)
+
+HERO_RESOLVER = HeroResolver(HERO_NAME_TO_KEY, HERO_ALIASES, HERO_PINYIN)
+
+class _CacheEntry:
+    """缓存条目"""
+    __slots__ = ("value", "soft_expire", "expire", "size", "group", "seq", "etag", "last_modified")
+
+    def __init__(self, value: Any, soft_expire: float, expire: float, size: int, group: str, seq: int,
+                 etag: Optional[str] = None, last_modified: Optional[str] = None):
+        self.value = value
+        self.soft_expire = soft_expire  # 软过期：之后视为陈旧数据，需后台刷新
+        self.expire = expire            # 硬过期：之后删除
+        self.size = size
+        self.group = group
+        self.seq = seq
+        self.etag = etag                # 上游ETag，用于条件请求
+        self.last_modified = last_modified
+
+    @property
+    def stale(self) -> bool:
+        """是否已过软TTL"""
+        return time.time() >= self.soft_expire
+
+class LRUCache:
+    """有界LRU+TTL缓存（条数/字节上限淘汰，过期堆主动清理，按分组清理）"""
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._groups: Dict[str, Set[str]] = {}
+        self._expiry_heap: List[Tuple[float, int, str]] = []
+        self._seq = 0
+        self._bytes = 0
+        # 统计计数
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
 
     def get(self, key: str) -> Optional[Any]:
-        """获取缓存，过期自动删除"""
-        if key not in self._data:
+        """获取未过软TTL的缓存值"""
+        entry = self.get_entry(key)
+        return entry.value if entry is not None and not entry.stale else None
+
+    def get_entry(self, key: str) -> Optional[_CacheEntry]:
+        """获取缓存条目（含已过软TTL的陈旧条目），命中则刷新LRU顺序"""
+        self.purge_expired()
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
             return None
-        expire, value = self._data[key]
-        if time.time() > expire:
-            self._data.pop(key)
+        self._data.move_to_end(key)
+        if entry.stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def peek(self, key: str) -> Optional[Any]:
+        """查看缓存（含陈旧数据；不计入命中统计、不刷新LRU顺序）"""
+        entry = self.peek_entry(key)
+        return entry.value if entry is not None else None
+
+    def peek_entry(self, key: str) -> Optional[_CacheEntry]:
+        """查看缓存条目（含陈旧条目；不计入命中统计、不刷新LRU顺序）"""
+        entry = self._data.get(key)
+        if entry is None or entry.expire <= time.time():
             return None
-        return value
+        return entry
+
+    def set(self, key: str, value: Any, ttl: float, group: str = "", hard_ttl: Optional[float] = None,
+            etag: Optional[str] = None, last_modified: Optional[str] = None) -> _CacheEntry:
+        """设置缓存（ttl为软TTL，hard_ttl缺省与其相同），超出上限时淘汰最久未使用的条目"""
+        self._remove(key)
+        self._seq += 1
+        now = time.time()
+        expire = now + max(ttl, hard_ttl or 0)
+        entry = _CacheEntry(value, now + ttl, expire, self._estimate_size(value), group, self._seq,
+                            etag=etag, last_modified=last_modified)
+        self._data[key] = entry
+        self._groups.setdefault(group, set()).add(key)
+        self._bytes += entry.size
+        heapq.heappush(self._expiry_heap, (entry.expire, entry.seq, key))
+        self.purge_expired()
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+        return entry
 
-    def set(self, key: str, value: Any, ttl: int):
-        """设置缓存"""
-        self._data[key] = (time.time() + ttl, value)
+    def delete(self, key: str):
+        """删除指定条目"""
+        self._remove(key)
 
-    def clear(self, pattern: Optional[str] = None):
-        """清理缓存，支持模糊匹配"""
-        if not pattern:
+    def purge_expired(self) -> int:
+        """按过期堆清理已过期条目，返回清理数量"""
+        now = time.time()
+        removed = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            _, seq, key = heapq.heappop(heap)
+            entry = self._data.get(key)
+            if entry is not None and entry.seq == seq:
+                self._remove(key)
+                removed += 1
+        self.expirations += removed
+        # 覆盖写入会在堆中留下失效记录，过多时重建
+        if len(heap) > 2 * len(self._data) + 64:
+            self._expiry_heap = [(e.expire, e.seq, k) for k, e in self._data.items()]
+            heapq.heapify(self._expiry_heap)
+        return removed
+
+    def clear(self, group: Optional[str] = None) -> int:
+        """清理缓存，指定分组时仅清理该分组，返回清理数量"""
+        if group is None:
+            removed = len(self._data)
             self._data.clear()
-            return
-        keys_to_remove = [k for k in self._data.keys() if pattern in k]
-        for key in keys_to_remove:
-            self._data.pop(key, None)
+            self._groups.clear()
+            self._expiry_heap.clear()
+            self._bytes = 0
+            return removed
+        keys = self._groups.pop(group, set())
+        for key in keys:
+            self._remove(key)
+        return len(keys)
 
     def size(self) -> int:
         """获取缓存大小"""
         return len(self._data)
 
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": ((self.hits + self.stale_hits) / lookups * 100) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key: str):
+        """移除条目并维护分组索引与字节统计"""
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        keys = self._groups.get(entry.group)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                self._groups.pop(entry.group, None)
+
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        """估算条目占用字节数（按紧凑JSON长度计）"""
+        try:
+            return len(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        except (TypeError, ValueError):
+            return sys.getsizeof(value)
+
+class _Reservation:
+    """排队中的令牌预约：放行时间与唤醒事件（时间槽被前移或顺延时置位，等待者据此重新计时）"""
+    __slots__ = ("slot", "wake")
+
+    def __init__(self, slot: float):
+        self.slot = slot
+        self.wake = asyncio.Event()
+
+    def move(self, slot: float):
+        self.slot = slot
+        self.wake.set()
+
 class RateLimiter:
-    """令牌桶限流 + 429冻结机制"""
+    """令牌桶限流 + 429冻结机制（单调时钟，统一的令牌时间线，排队者按到达顺序逐个放行）"""
     def __init__(self, rate: float = 1.0, burst: int = 3):
         self._rate = rate
         self._burst = burst
-        self._tokens = burst
-        self._last = time.time()
+        self._interval = 1.0 / rate
+        # 下一个令牌的理论发放时间（GCRA）；已满的桶对应 _next_slot <= now
+        self._next_slot = time.monotonic()
         self._freeze_until = 0.0
-        self._lock = asyncio.Lock()
+        # 排队中的预约（先到先得），冻结时整体顺延
+        self._queue: deque = deque()
+        # 统计指标
+        self.waiting = 0
+        self.granted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _tokens(self, now: float) -> float:
+        """当前可用令牌数（负数表示已被预约的未来令牌）"""
+        return min(float(self._burst), (now - self._next_slot) / self._interval + self._burst)
+
+    def _reserve(self, now: float) -> float:
+        """预约一个令牌，返回其放行时间"""
+        slot = max(now, self._next_slot - (self._burst - 1) * self._interval, self._freeze_until)
+        self._next_slot = max(self._next_slot, now) + self._interval
+        return slot
+
+    def _release(self, ticket: _Reservation):
+        """放弃尚未放行的预约：后续排队者依次接替前一个的时间槽并被唤醒，归还一个令牌"""
+        items = list(self._queue)
+        idx = items.index(ticket)
+        for i in range(len(items) - 1, idx, -1):
+            items[i].move(items[i - 1].slot)
+        self._queue.remove(ticket)
+        self._next_slot -= self._interval
 
     async def acquire(self, timeout: float = 35) -> bool:
-        """获取令牌，超时返回False"""
-        async with self._lock:
-            while True:
-                now = time.time()
-                if now >= self._freeze_until:
-                    added = (now - self._last) * self._rate
-                    self._tokens = min(self._burst, self._tokens + added)
-                    self._last = now
-                if self._tokens >= 1:
-                    self._tokens -= 1
-                    return True
-                sleep_for = min(1 / self._rate, self._freeze_until - now)
-                if sleep_for <= 0:
-                    continue
-                if timeout <= 0:
-                    return False
-                await asyncio.sleep(min(sleep_for, timeout))
-                timeout -= sleep_for
+        """获取令牌，预计等待超过timeout时立即返回False"""
+        start = time.monotonic()
+        deadline = start + timeout
+        slot = max(start, self._next_slot - (self._burst - 1) * self._interval, self._freeze_until)
+        if slot > deadline:
+            self.rejected += 1
+            return False
+        ticket = _Reservation(self._reserve(start))
+        if ticket.slot > start:
+            self._queue.append(ticket)
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    # 等待期间时间槽可能被前移（前面的人放弃）或顺延（429冻结），被唤醒后重新判断
+                    if now >= ticket.slot:
+                        break
+                    if ticket.slot > deadline:
+                        self._release(ticket)
+                        self.rejected += 1
+                        return False
+                    ticket.wake.clear()
+                    try:
+                        await asyncio.wait_for(ticket.wake.wait(), ticket.slot - now)
+                    except asyncio.TimeoutError:
+                        pass
+            except asyncio.CancelledError:
+                self._release(ticket)
+                raise
+            finally:
+                self.waiting -= 1
+            self._queue.remove(ticket)
+
+        waited = time.monotonic() - start
+        self.granted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return True
+
+    def try_acquire(self, reserve: int = 0) -> bool:
+        """非阻塞获取令牌：无人排队、未冻结且取后仍剩余reserve个令牌时才成功"""
+        now = time.monotonic()
+        if self.waiting or now < self._freeze_until or self._tokens(now) < 1 + reserve:
+            return False
+        self._reserve(now)
+        self.granted += 1
+        return True
 
     def freeze(self, seconds: int):
-        """冻结指定秒数"""
-        self._freeze_until = max(self._freeze_until, time.time() + seconds)
+        """冻结指定秒数：时间线整体顺延，排队者解冻后仍按1/rate间隔依次放行"""
+        now = time.monotonic()
+        until = now + seconds
+        delta = until - max(now, self._freeze_until)
+        if delta <= 0:
+            return
+        self._freeze_until = until
+        self._next_slot = max(self._next_slot, now) + delta
+        for ticket in self._queue:
+            ticket.move(max(ticket.slot, now) + delta)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取限流统计"""
+        now = time.monotonic()
+        return {
+            "tokens": max(0.0, self._tokens(now)),
+            "waiting": self.waiting,
+            "granted": self.granted,
+            "rejected": self.rejected,
+            "avg_wait": (self.total_wait / self.granted) if self.granted else 0.0,
+            "max_wait": self.max_wait,
+            "frozen_for": max(0.0, self._freeze_until - now),
+        }
+
+class SqliteStore(abc.ABC):
+    """SQLite存储基类：独立线程读写，待写入数据合并后延迟批量落盘（子类定义表结构与落盘逻辑）"""
+    LOG_PREFIX = "[OW存储]"
+    STORE_NAME = "数据"
+
+    def __init__(self, path: Path, flush_interval: float, thread_name: str):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=thread_name)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: Any = self._new_pending()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.writes = 0
+
+    async def _run(self, func, *args):
+        """在专用线程中执行数据库操作"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _db(self) -> sqlite3.Connection:
+        """获取数据库连接（仅在专用线程中调用），首次连接时建表"""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._init_schema(self._conn)
+            self._conn.commit()
+        return self._conn
+
+    @abc.abstractmethod
+    def _init_schema(self, conn: sqlite3.Connection):
+        """建表（首次连接时在专用线程中调用）"""
+
+    def _new_pending(self) -> Any:
+        """空的待写入容器"""
+        return []
+
+    def _schedule_flush(self):
+        """登记延迟落盘任务（已有任务时合并）"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        """将待写入数据批量落盘"""
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, self._new_pending()
+        try:
+            self.writes += await self._run(self._flush_sync, rows)
+        except Exception as e:
+            logger.error(f"{self.LOG_PREFIX} 写入{self.STORE_NAME}失败: {str(e)}")
+
+    @abc.abstractmethod
+    def _flush_sync(self, rows: Any) -> int:
+        """落盘（专用线程中执行），返回实际写入条数"""
+
+    async def close(self):
+        """落盘剩余数据并关闭数据库"""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+class DiskCache(SqliteStore):
+    """SQLite持久化缓存层（独立线程读写，写入合并后批量异步落盘）"""
+    LOG_PREFIX = "[OW缓存]"
+    STORE_NAME = "持久化缓存"
+
+    def __init__(self, path: Path, flush_interval: float = DISK_CACHE_FLUSH_INTERVAL):
+        super().__init__(path, flush_interval, "owcx-disk-cache")
+        # 统计计数
+        self.loads = 0
+
+    def _new_pending(self) -> Dict[str, Tuple[str, Any, float, float, Optional[str], Optional[str]]]:
+        return {}
+
+    def _init_schema(self, conn: sqlite3.Connection):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, grp TEXT NOT NULL, value TEXT NOT NULL, "
+            "soft_expire REAL NOT NULL, expire REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_grp ON cache(grp)")
+        # 每次落盘都会清理过期条目，按expire建索引避免全表扫描
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expire ON cache(expire)")
+        # 旧版本数据库补充条件请求所需的列
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+        for column in ("etag", "last_modified"):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE cache ADD COLUMN {column} TEXT")
+
+    async def load(self, key: str) -> Optional[Tuple[str, Any, float, float, Optional[str], Optional[str]]]:
+        """读取未硬过期的条目：(分组, 数据, 软过期时间, 硬过期时间, ETag, Last-Modified)"""
+        row = self._pending.get(key)
+        if row is None:
+            try:
+                row = await self._run(self._load_sync, key)
+            except Exception as e:
+                logger.error(f"[OW缓存] 读取持久化缓存失败: {str(e)}")
+                return None
+        if row is None or row[3] <= time.time():
+            return None
+        self.loads += 1
+        return row
+
+    def _load_sync(self, key: str) -> Optional[Tuple[str, Any, float, float, Optional[str], Optional[str]]]:
+        cur = self._db().execute(
+            "SELECT grp, value, soft_expire, expire, etag, last_modified FROM cache WHERE key = ?", (key,)
+        )
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2], row[3], row[4], row[5]
+
+    def store(self, key: str, group: str, value: Any, soft_expire: float, expire: float,
+              etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """登记待写入条目（同一key只保留最新值），稍后批量落盘"""
+        self._pending[key] = (group, value, soft_expire, expire, etag, last_modified)
+        self._schedule_flush()
+
+    def _flush_sync(self, rows: Dict[str, Tuple[str, Any, float, float, Optional[str], Optional[str]]]) -> int:
+        """批量写入，并顺带清理已过期条目"""
+        db = self._db()
+        db.executemany(
+            "INSERT OR REPLACE INTO cache (key, grp, value, soft_expire, expire, etag, last_modified) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(k, g, json.dumps(v, ensure_ascii=False, separators=(",", ":")), se, e, et, lm)
+             for k, (g, v, se, e, et, lm) in rows.items()]
+        )
+        db.execute("DELETE FROM cache WHERE expire <= ?", (time.time(),))
+        db.commit()
+        return len(rows)
+
+    async def clear(self, group: Optional[str] = None):
+        """清理持久化缓存，指定分组时仅清理该分组"""
+        if group is None:
+            self._pending.clear()
+        else:
+            self._pending = {k: v for k, v in self._pending.items() if v[0] != group}
+        try:
+            await self._run(self._clear_sync, group)
+        except Exception as e:
+            logger.error(f"[OW缓存] 清理持久化缓存失败: {str(e)}")
+
+    def _clear_sync(self, group: Optional[str]):
+        db = self._db()
+        if group is None:
+            db.execute("DELETE FROM cache")
+        else:
+            db.execute("DELETE FROM cache WHERE grp = ?", (group,))
+        db.commit()
+
+class HistoryStore(SqliteStore):
+    """战绩历史时序库（SQLite列式快照表，按(tag, mode, ts)聚簇索引，独立线程批量写入）"""
+    LOG_PREFIX = "[OW历史]"
+    STORE_NAME = "历史数据"
+    MODE_COLUMNS = ("gp", "gw", "kda", "elim", "deaths", "dmg", "heal")
+    ROLES = ("tank", "damage", "support")
+    TABLES = ("mode_history", "rank_history")
+
+    def __init__(self, path: Path, flush_interval: float = HISTORY_FLUSH_INTERVAL,
+                 retention_days: int = HISTORY_RETENTION_DAYS):
+        super().__init__(path, flush_interval, "owcx-history")
+        self._last: Dict[Tuple[str, str, str], Tuple[Any, ...]] = {}  # 最近一次记录的数值，用于去重
+        self.retention = retention_days * 86400
+        self._last_sweep = 0.0  # 仅在专用线程中读写
+        # 统计计数
+        self.deduped = 0
+        self.swept = 0
+
+    def _init_schema(self, conn: sqlite3.Connection):
+        # WITHOUT ROWID：行按主键(tag, mode, ts)聚簇存放，区间查询为连续读取
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS mode_history ("
+            "tag TEXT NOT NULL, mode TEXT NOT NULL, ts INTEGER NOT NULL, "
+            "gp INTEGER, gw INTEGER, kda REAL, elim REAL, deaths REAL, dmg REAL, heal REAL, "
+            "PRIMARY KEY (tag, mode, ts)) WITHOUT ROWID"
+        )
+        # 段位快照：mode列存放平台（pc/console），各角色存为"段位-等级"
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rank_history ("
+            "tag TEXT NOT NULL, mode TEXT NOT NULL, ts INTEGER NOT NULL, "
+            "tank TEXT, damage TEXT, support TEXT, "
+            "PRIMARY KEY (tag, mode, ts)) WITHOUT ROWID"
+        )
+
+    @staticmethod
+    def _key(tag: str) -> str:
+        """玩家标签规范化（不区分大小写，#与-等价）"""
+        return tag.replace("#", "-").lower()
+
+    def record_mode(self, tag: str, mode: str, stats: Dict[str, Any]):
+        """记录一次模式统计快照"""
+        general = stats.get("general") or {}
+        average = general.get("average") or {}
+        values = (
+            general.get("games_played"), general.get("games_won"), general.get("kda"),
+            average.get("eliminations"), average.get("deaths"), average.get("damage"), average.get("healing"),
+        )
+        if values[0] is not None:
+            self._append("mode_history", tag, mode, values)
+
+    def record_summary(self, tag: str, summary: Dict[str, Any]):
+        """记录一次各平台段位快照"""
+        competitive = summary.get("competitive") or {}
+        for platform in ("pc", "console"):
+            platform_data = competitive.get(platform) or {}
+            values = tuple(
+                f"{(platform_data.get(role) or {}).get('division')}-{(platform_data.get(role) or {}).get('tier')}"
+                if (platform_data.get(role) or {}).get("division") else None
+                for role in self.ROLES
+            )
+            if any(values):
+                self._append("rank_history", tag, platform, values)
+
+    def _append(self, table: str, tag: str, mode: str, values: Tuple[Any, ...]):
+        """登记快照（与上一次记录相同则跳过），稍后批量落盘"""
+        key = (table, self._key(tag), mode)
+        if self._last.get(key) == values:
+            self.deduped += 1
+            return
+        self._last[key] = values
+        self._pending.append((table, key[1], mode, int(time.time()), values))
+        self._schedule_flush()
+
+    def _flush_sync(self, rows: List[Tuple[str, str, str, int, Tuple[Any, ...]]]) -> int:
+        """批量写入快照，并定期清理超出保留期的旧快照"""
+        db = self._db()
+        written = 0
+        for table, tag, mode, ts, values in rows:
+            columns = self.MODE_COLUMNS if table == "mode_history" else self.ROLES
+            # 重启后内存去重表为空，与库中最近一条比较
+            last = db.execute(
+                f"SELECT {', '.join(columns)} FROM {table} WHERE tag = ? AND mode = ? ORDER BY ts DESC LIMIT 1",
+                (tag, mode)
+            ).fetchone()
+            if last == values:
+                continue
+            db.execute(
+                f"INSERT OR REPLACE INTO {table} (tag, mode, ts, {', '.join(columns)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' * len(columns))})",
+                (tag, mode, ts, *values)
+            )
+            written += 1
+        now = time.time()
+        if now - self._last_sweep >= HISTORY_SWEEP_INTERVAL:
+            self._last_sweep = now
+            self.swept += self._sweep(db, int(now - self.retention))
+        db.commit()
+        return written
+
+    def _sweep(self, db: sqlite3.Connection, cutoff: int) -> int:
+        """删除cutoff之前的快照，但每组保留最后一条作为区间查询的基线"""
+        removed = 0
+        for table in self.TABLES:
+            removed += db.execute(
+                f"DELETE FROM {table} WHERE ts < ? AND ts < ("
+                f"SELECT MAX(b.ts) FROM {table} AS b "
+                f"WHERE b.tag = {table}.tag AND b.mode = {table}.mode AND b.ts < ?)",
+                (cutoff, cutoff)
+            ).rowcount
+        return removed
+
+    async def query(self, table: str, tag: str, mode: str, since: float) -> List[Tuple[Any, ...]]:
+        """区间查询：返回since之前的最后一条（作为基线）及之后的全部快照，按时间升序"""
+        await self.flush()
+        try:
+            return await self._run(self._query_sync, table, self._key(tag), mode, int(since))
+        except Exception as e:
+            logger.error(f"[OW历史] 读取历史数据失败: {str(e)}")
+            return []
+
+    def _query_sync(self, table: str, tag: str, mode: str, since: int) -> List[Tuple[Any, ...]]:
+        db = self._db()
+        columns = "ts, " + ", ".join(self.MODE_COLUMNS if table == "mode_history" else self.ROLES)
+        baseline = db.execute(
+            f"SELECT {columns} FROM {table} WHERE tag = ? AND mode = ? AND ts < ? ORDER BY ts DESC LIMIT 1",
+            (tag, mode, since)
+        ).fetchall()
+        rows = db.execute(
+            f"SELECT {columns} FROM {table} WHERE tag = ? AND mode = ? AND ts >= ? ORDER BY ts",
+            (tag, mode, since)
+        ).fetchall()
+        return baseline + rows
+
+def write_atomic(path: Path, text: str):
+    """写入临时文件后原子替换，避免写入中途崩溃导致文件损坏"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class Histogram:
+    """固定分桶的延迟直方图"""
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个为+Inf桶
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """记录一个观测值"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q: float) -> float:
+        """按分桶估算分位数（返回所在桶的上界）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for i, c in enumerate(self.counts):
+            cumulative += c
+            if cumulative >= target:
+                return self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+        return self.buckets[-1]
+
+class Metrics:
+    """插件运行指标（计数器+延迟直方图），可导出Prometheus文本或JSON"""
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """计数器累加"""
+        key = self._key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """记录直方图观测值"""
+        key = self._key(name, labels)
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = Histogram()
+        hist.observe(value)
+
+    def counter_values(self, name: str) -> Dict[Tuple[Tuple[str, str], ...], float]:
+        """获取指定计数器的全部标签取值"""
+        return {labels: v for (n, labels), v in self.counters.items() if n == name}
+
+    def histogram_values(self, name: str) -> Dict[Tuple[Tuple[str, str], ...], Histogram]:
+        """获取指定直方图的全部标签取值"""
+        return {labels: h for (n, labels), h in self.histograms.items() if n == name}
+
+    @staticmethod
+    def _escape_label(value: str) -> str:
+        """转义标签值中的反斜杠、双引号与换行（Prometheus文本格式要求）"""
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    @classmethod
+    def _format_labels(cls, labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+        parts = [f'{k}="{cls._escape_label(v)}"' for k, v in labels]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def to_prometheus(self) -> str:
+        """导出Prometheus文本格式（同名指标按族连续输出，每族一行TYPE声明）"""
+        lines = []
+        family = None
+        for (name, labels), value in sorted(self.counters.items()):
+            if name != family:
+                family = name
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{self._format_labels(labels)} {value:g}")
+        for (name, labels), hist in sorted(self.histograms.items(), key=lambda x: x[0]):
+            if name != family:
+                family = name
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(list(hist.buckets) + ["+Inf"], hist.counts):
+                cumulative += count
+                le = bound if isinstance(bound, str) else f"{bound:g}"
+                bucket_labels = self._format_labels(labels, 'le="' + le + '"')
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {hist.sum:.6f}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> Dict[str, Any]:
+        """导出JSON结构"""
+        return {
+            "timestamp": time.time(),
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self.counters.items()
+            ],
+            "histograms": [
+                {"name": name, "labels": dict(labels), "count": h.count, "sum": h.sum,
+                 "p50": h.percentile(0.5), "p95": h.percentile(0.95), "p99": h.percentile(0.99),
+                 "buckets": dict(zip([f"{b:g}" for b in h.buckets] + ["+Inf"], h.counts))}
+                for (name, labels), h in self.histograms.items()
+            ],
+        }
+
+def instrumented(command: str):
+    """命令耗时统计装饰器（记录端到端耗时与调用次数）"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, event: AstrMessageEvent, *args, **kwargs):
+            started = time.monotonic()
+            self.client.metrics.inc("owcx_commands_total", command=command)
+            try:
+                async for result in func(self, event, *args, **kwargs):
+                    yield result
+            finally:
+                self.client.metrics.observe("owcx_command_seconds", time.monotonic() - started, command=command)
+        return wrapper
+    return decorator
+
+class AdmissionController:
+    """命令准入控制：发送者/群令牌桶 + 每人未完成查询上限 + 同一发送者相同命令去重（均为O(1)判断）"""
+    def __init__(self, user_rate: float = ADMISSION_USER_RATE, user_burst: int = ADMISSION_USER_BURST,
+                 group_rate: float = ADMISSION_GROUP_RATE, group_burst: int = ADMISSION_GROUP_BURST,
+                 max_inflight: int = ADMISSION_MAX_INFLIGHT, max_keys: int = ADMISSION_MAX_KEYS):
+        self.user_rate = user_rate / 60    # 每秒补充的令牌数
+        self.user_burst = user_burst
+        self.group_rate = group_rate / 60
+        self.group_burst = group_burst
+        self.max_inflight = max_inflight
+        self.max_keys = max_keys
+        self._user_buckets: "OrderedDict[str, List[float]]" = OrderedDict()   # 发送者 -> [令牌数, 更新时间]
+        self._group_buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # 群 -> [令牌数, 更新时间]
+        self._inflight: Dict[str, Set[str]] = {}  # 发送者 -> 进行中的命令
+        # 统计计数
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"duplicate": 0, "inflight": 0, "user_rate": 0, "group_rate": 0}
+
+    def _bucket(self, buckets: "OrderedDict[str, List[float]]", key: str, rate: float, burst: int,
+                now: float) -> List[float]:
+        """获取并补充令牌桶（超出跟踪上限时淘汰最久未使用的桶）"""
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = [float(burst), now]
+            while len(buckets) > self.max_keys:
+                buckets.popitem(last=False)
+        else:
+            buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        return bucket
+
+    def admit(self, sender: str, group: str, command_key: str, cost: float = 1) -> Tuple[bool, str]:
+        """尝试准入一条命令，返回 (是否放行, 拒绝提示)；放行后需调用release"""
+        cost = min(cost, self.user_burst, self.group_burst)  # 保证突发上限较小时仍可放行
+        running = self._inflight.get(sender, set())
+        if command_key in running:
+            return self._reject("duplicate", "⏳ 相同的查询正在进行中，结果稍后送达，请勿重复发送")
+        if len(running) >= self.max_inflight:
+            return self._reject("inflight", f"⏳ 你还有 {len(running)} 个查询未完成，请稍候再试")
+        now = time.monotonic()
+        user_bucket = self._bucket(self._user_buckets, sender, self.user_rate, self.user_burst, now)
+        if user_bucket[0] < cost:
+            wait = (cost - user_bucket[0]) / self.user_rate if self.user_rate > 0 else 60
+            return self._reject("user_rate", f"⏳ 查询过于频繁，请 {wait:.0f} 秒后再试")
+        group_bucket = None
+        if group:
+            group_bucket = self._bucket(self._group_buckets, group, self.group_rate, self.group_burst, now)
+            if group_bucket[0] < cost:
+                wait = (cost - group_bucket[0]) / self.group_rate if self.group_rate > 0 else 60
+                return self._reject("group_rate", f"⏳ 本群查询过于频繁，请 {wait:.0f} 秒后再试")
+            group_bucket[0] -= cost
+        user_bucket[0] -= cost
+        self._inflight.setdefault(sender, set()).add(command_key)
+        self.admitted += 1
+        return True, ""
+
+    def _reject(self, reason: str, message: str) -> Tuple[bool, str]:
+        self.rejected[reason] += 1
+        return False, message
+
+    def release(self, sender: str, command_key: str):
+        """命令结束，释放未完成查询名额"""
+        running = self._inflight.get(sender)
+        if running is not None:
+            running.discard(command_key)
+            if not running:
+                del self._inflight[sender]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "inflight": sum(len(v) for v in self._inflight.values()),
+        }
+
+def admitted(command: str, cost: float = 1):
+    """命令准入装饰器（放在instrumented之后，拒绝的命令同样计入命令统计）"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, event: AstrMessageEvent, *args, **kwargs):
+            admission = self.admission
+            if admission is None:
+                async for result in func(self, event, *args, **kwargs):
+                    yield result
+                return
+            sender = str(event.get_sender_id())
+            command_key = " ".join(event.message_str.split())
+            ok, reason = admission.admit(sender, str(event.get_group_id() or ""), command_key, cost)
+            if not ok:
+                self.client.metrics.inc("owcx_admission_rejected_total", command=command)
+                yield event.plain_result(reason)
+                return
+            try:
+                async for result in func(self, event, *args, **kwargs):
+                    yield result
+            finally:
+                admission.release(sender, command_key)
+        return wrapper
+    return decorator
+
+class JsonFileStore:
+    """JSON文件存储（修改后延迟合并写入，线程中序列化，临时文件+原子替换）"""
+    def __init__(self, path: Path, flush_delay: float = BIND_FLUSH_DELAY):
+        self.path = path
+        self.flush_delay = flush_delay
+        self._snapshot_source: Optional[Dict[str, Any]] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def load(self) -> Dict[str, Any]:
+        """同步读取文件（仅在初始化时调用）"""
+        if self.path.exists():
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        return {}
+
+    def schedule_save(self, data: Dict[str, Any]):
+        """标记待保存，延迟后合并写入"""
+        self._snapshot_source = data
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.flush_delay)
+        await self.flush()
+
+    async def flush(self):
+        """立即落盘待保存的数据"""
+        async with self._lock:
+            if self._snapshot_source is None:
+                return
+            snapshot = dict(self._snapshot_source)
+            self._snapshot_source = None
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._write_atomic, snapshot)
+            except Exception as e:
+                logger.error(f"保存数据文件失败: {self.path} | {str(e)}")
+
+    def _write_atomic(self, snapshot: Dict[str, Any]):
+        """序列化并原子写入文件"""
+        write_atomic(self.path, json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")))
+
+    async def close(self):
+        """取消延迟任务并落盘剩余数据"""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+
+class CircuitBreaker:
+    """熔断器（关闭/打开/半开），按窗口内错误率与慢调用判定"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window: float = BREAKER_WINDOW, min_requests: int = BREAKER_MIN_REQUESTS,
+                 error_rate: float = BREAKER_ERROR_RATE, slow_call: float = BREAKER_SLOW_CALL,
+                 open_seconds: float = BREAKER_OPEN_SECONDS):
+        self.window = window
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self._outcomes: "deque[Tuple[float, bool]]" = deque()  # (时间, 是否失败)
+        self._open_until = 0.0
+        self._probe_started = 0.0
+        # 统计计数
+        self.opened = 0
+        self.short_circuited = 0
+
+    def allow(self) -> bool:
+        """是否允许请求上游（打开状态到期后只放行一个探测请求）"""
+        now = time.monotonic()
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and now >= self._open_until:
+            self.state = self.HALF_OPEN
+            self._probe_started = now
+            logger.info("[OWAPI] 熔断器进入半开状态，放行探测请求")
+            return True
+        # 半开状态下探测请求长时间无结果（如排队超时），允许重新探测
+        if self.state == self.HALF_OPEN and now - self._probe_started > self.open_seconds:
+            self._probe_started = now
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record(self, success: bool, latency: float):
+        """记录一次上游调用结果"""
+        now = time.monotonic()
+        failed = not success or latency >= self.slow_call
+        if self.state == self.HALF_OPEN:
+            if failed:
+                self._trip(now)
+            else:
+                self.state = self.CLOSED
+                self._outcomes.clear()
+                logger.info("[OWAPI] 探测成功，熔断器关闭")
+            return
+
+        self._outcomes.append((now, failed))
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+        total = len(self._outcomes)
+        failures = sum(1 for _, f in self._outcomes if f)
+        if self.state == self.CLOSED and total >= self.min_requests and failures / total >= self.error_rate:
+            self._trip(now)
+
+    def _trip(self, now: float):
+        """打开熔断器"""
+        self.state = self.OPEN
+        self._open_until = now + self.open_seconds
+        self.opened += 1
+        logger.warning(f"[OWAPI] 上游错误率过高，熔断{self.open_seconds:g}秒")
+
+    def stats(self) -> Dict[str, Any]:
+        """获取熔断统计"""
+        total = len(self._outcomes)
+        failures = sum(1 for _, f in self._outcomes if f)
+        return {
+            "state": self.state,
+            "error_rate": (failures / total * 100) if total else 0.0,
+            "opened": self.opened,
+            "short_circuited": self.short_circuited,
+        }
+
+class RetryBudget:
+    """全局重试预算：窗口内重试次数不超过主请求数的一定比例"""
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, min_retries: int = RETRY_BUDGET_MIN,
+                 window: float = BREAKER_WINDOW):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests: "deque[float]" = deque()
+        self._retries: "deque[float]" = deque()
+        self.denied = 0
+
+    def _prune(self, now: float):
+        for q in (self._requests, self._retries):
+            while q and now - q[0] > self.window:
+                q.popleft()
+
+    def record_request(self):
+        """记录一次主请求"""
+        now = time.monotonic()
+        self._prune(now)
+        self._requests.append(now)
+
+    def can_retry(self) -> bool:
+        """尝试消耗一次重试额度"""
+        now = time.monotonic()
+        self._prune(now)
+        if len(self._retries) < self.min_retries + self.ratio * len(self._requests):
+            self._retries.append(now)
+            return True
+        self.denied += 1
+        return False
+
+class HealthTracker:
+    """上游健康被动统计：最近成功/失败时间、窗口错误率与延迟分位数"""
+    def __init__(self, window: float = HEALTH_WINDOW, max_samples: int = HEALTH_MAX_SAMPLES):
+        self.window = window
+        self._samples: "deque[Tuple[float, bool, float]]" = deque(maxlen=max_samples)  # (时间, 是否成功, 耗时)
+        self.last_success: Optional[float] = None
+        self.last_failure: Optional[float] = None
+        self.last_outcome = ""
+        self.last_probe: Optional[float] = None
+
+    def record(self, success: bool, latency: float, outcome: str):
+        """记录一次上游调用结果"""
+        now = time.monotonic()
+        self._samples.append((now, success, latency))
+        if success:
+            self.last_success = now
+        else:
+            self.last_failure = now
+        self.last_outcome = outcome
+
+    @property
+    def last_activity(self) -> Optional[float]:
+        """最近一次上游调用时间"""
+        return self._samples[-1][0] if self._samples else None
+
+    def stats(self) -> Dict[str, Any]:
+        """窗口内统计（时间字段为距今秒数，无记录时为None）"""
+        now = time.monotonic()
+        recent = [(ok, latency) for ts, ok, latency in self._samples if now - ts <= self.window]
+        latencies = sorted(latency for _, latency in recent)
+
+        def quantile(q: float) -> float:
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+
+        return {
+            "requests": len(recent),
+            "error_rate": sum(1 for ok, _ in recent if not ok) / len(recent) * 100 if recent else 0.0,
+            "p50": quantile(0.5),
+            "p95": quantile(0.95),
+            "last_success_ago": now - self.last_success if self.last_success is not None else None,
+            "last_failure_ago": now - self.last_failure if self.last_failure is not None else None,
+            "last_outcome": self.last_outcome,
+        }
+
+class RequestScheduler:
+    """上游请求调度：交互查询直接排队取令牌，后台任务只使用空闲令牌且占比受限"""
+    def __init__(self, limiter: RateLimiter, background_share: float = BACKGROUND_SHARE,
+                 window: float = 60.0, poll_interval: float = 0.5):
+        self.limiter = limiter
+        self.background_share = background_share
+        self.window = window
+        self.poll_interval = poll_interval
+        self._background_grants: "deque[float]" = deque()
+        # 统计指标
+        self.interactive_granted = 0
+        self.background_granted = 0
+        self.background_rejected = 0
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE, timeout: float = 35) -> bool:
+        """按优先级获取令牌，超时返回False"""
+        if priority <= PRIORITY_INTERACTIVE:
+            ok = await self.limiter.acquire(timeout=timeout)
+            if ok:
+                self.interactive_granted += 1
+            return ok
+
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._background_allowed() and self.limiter.try_acquire(reserve=BACKGROUND_RESERVE):
+                self._background_grants.append(time.monotonic())
+                self.background_granted += 1
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.background_rejected += 1
+                return False
+            await asyncio.sleep(min(self.poll_interval, remaining))
+
+    def _background_allowed(self) -> bool:
+        """后台任务在统计窗口内的令牌占用是否低于上限"""
+        now = time.monotonic()
+        while self._background_grants and now - self._background_grants[0] > self.window:
+            self._background_grants.popleft()
+        cap = max(1, int(self.background_share * self.limiter._rate * self.window))
+        return len(self._background_grants) < cap
+
+    def stats(self) -> Dict[str, Any]:
+        """获取调度统计"""
+        return {
+            "interactive_granted": self.interactive_granted,
+            "background_granted": self.background_granted,
+            "background_rejected": self.background_rejected,
+        }
 
 # ---------- API客户端（修复resp异常+超时优化） ----------
+class _FlightBudget:
+    """进行中请求的截止时间（time.monotonic()），后加入的调用方可延长"""
+    __slots__ = ("deadline",)
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+
+    def extend(self, deadline: float):
+        self.deadline = max(self.deadline, deadline)
+
+    @property
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+class _BudgetExpired(Exception):
+    """调用方截止时间已到，本次尝试被提前中止（非上游故障）"""
+
+class _UpstreamResponse:
+    """已读取完毕的上游响应（状态码、响应头、200时解析后的数据及响应体字节数）"""
+    __slots__ = ("status", "headers", "data", "size")
+
+    def __init__(self, status: int, headers: Any, data: Any = None, size: int = 0):
+        self.status = status
+        self.headers = headers
+        self.data = data
+        self.size = size
+
 class OWAPIClient:
     """守望先锋API客户端（默认休闲模式）"""
-    def __init__(self, timeout: int = 60, max_retries: int = 3):  # 超时延长到60秒
+    def __init__(self, timeout: int = 60, max_retries: int = 3,  # 超时延长到60秒
+                 pool_limit: int = POOL_LIMIT, pool_limit_per_host: int = POOL_LIMIT_PER_HOST,
+                 keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+                 cache_max_entries: int = CACHE_MAX_ENTRIES, cache_max_bytes: int = CACHE_MAX_BYTES,
+                 disk_cache: Optional[DiskCache] = None, honor_cache_headers: bool = True,
+                 api_base: str = OW_API, rate: float = RATE_LIMIT, burst: int = RATE_BURST,
+                 history: Optional[HistoryStore] = None, hedge: bool = False):
         self.timeout = aiohttp.ClientTimeout(total=timeout)
         self.max_retries = max_retries
-        self.limiter = RateLimiter(rate=1.0, burst=3)
-        self.cache = TimedCache()
+        self.api_base = api_base.rstrip("/")
+        self.limiter = RateLimiter(rate=rate, burst=burst)
+        self.scheduler = RequestScheduler(self.limiter)
+        self.breaker = CircuitBreaker()
+        self.retry_budget = RetryBudget()
+        self.health = HealthTracker()
+        self.hedge = hedge  # 是否启用对冲请求
+        self.hedged = 0     # 发出的对冲请求数
+        self.hedge_wins = 0  # 对冲请求先于首个请求返回的次数
+        self.cache = LRUCache(max_entries=cache_max_entries, max_bytes=cache_max_bytes)
+        self.disk = disk_cache  # 可选的持久化缓存层
+        self.history = history  # 可选的战绩历史库
+        self.honor_cache_headers = honor_cache_headers  # 是否使用上游缓存头覆盖TTL
+        self.revalidated = 0  # 304命中次数
+        self.metrics = Metrics()
+        # 负缓存（与正常缓存分开存放，值为错误提示）
+        self.negative_cache = LRUCache(max_entries=NEGATIVE_CACHE_MAX_ENTRIES)
+        # 字段裁剪统计（裁剪前/后的估算字节数）
+        self.raw_bytes = 0
+        self.projected_bytes = 0
+        # 长连接池配置（会话在首次请求时懒创建）
+        self.pool_limit = pool_limit
+        self.pool_limit_per_host = pool_limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        # 进行中的请求表（URL -> (共享Future, 优先级)），相同URL的并发请求合并为一次
+        self._inflight: Dict[str, Tuple[asyncio.Future, int, _FlightBudget]] = {}
+        # 英雄目录（hero_key -> 各语言名称）及加载失败后的下次重试时间（monotonic）
+        self._hero_catalog: Dict[str, List[str]] = {}
+        self._catalog_retry_at = 0.0
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取共享会话（懒创建，复用连接池+DNS缓存）"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_limit,
+                limit_per_host=self.pool_limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                use_dns_cache=True,
+            )
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout, connector=connector,
+                headers={"Accept-Encoding": ACCEPT_ENCODING},
+            )
+        return self._session
+
+    async def close(self):
+        """取消后台刷新并关闭共享会话，释放连接池"""
+        for flight, _, _ in list(self._inflight.values()):
+            flight.cancel()
+        self._inflight.clear()
+        if self.disk is not None:
+            await self.disk.close()
+        if self.history is not None:
+            await self.history.close()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get(self, url: str, ttl: Tuple[int, int], timeout: float = 60,
+                   priority: int = PRIORITY_INTERACTIVE,
+                   projection: Optional[Dict[str, Any]] = None,
+                   deadline: Optional[float] = None) -> Tuple[Optional[Dict[str, Any]], str]:
+        """基础请求方法：新鲜缓存直接返回，陈旧缓存先返回并后台刷新，相同URL的并发请求共享同一次上游调用
+
+        deadline为命令截止时间（time.monotonic()），限流等待、重试与HTTP超时均不超过该时间
+        """
+        endpoint = self._endpoint_name(url)
+        entry = self.cache.get_entry(url)
+        # 负缓存在持久化缓存之前检查：打错/未公开的标签无需每次都往返数据库线程
+        if entry is None:
+            negative = self.negative_cache.get(url)
+            if negative is not None:
+                logger.debug(f"[OWAPI] 命中负缓存: {url}")
+                self.metrics.inc("owcx_cache_requests_total", endpoint=endpoint, result="negative")
+                return None, negative
+        from_disk = False
+        if entry is None and self.disk is not None:
+            entry = await self._load_from_disk(url)
+            from_disk = entry is not None
+        if entry is not None:
+            if entry.stale:
+                logger.debug(f"[OWAPI] 返回陈旧缓存并后台刷新: {url}")
+                self._start_flight(url, ttl, timeout, PRIORITY_BACKGROUND, projection)
+            # 每次查找只计一个结果：持久化缓存回填计为disk，不再重复计hit/stale
+            result = "disk" if from_disk else ("stale" if entry.stale else "hit")
+            self.metrics.inc("owcx_cache_requests_total", endpoint=endpoint, result=result)
+            return entry.value, ""
+
+        self.metrics.inc("owcx_cache_requests_total", endpoint=endpoint, result="miss")
+
+        remaining = timeout if deadline is None else min(timeout, deadline - time.monotonic())
+        flight = self._start_flight(url, ttl, remaining, priority, projection)
+        # shield：单个调用方取消（如汇总查询超时）不影响其他等待者；合并到他人的请求时也只等到自己的截止时间
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight), max(0.0, remaining))
+        except asyncio.TimeoutError:
+            return None, "请求超时，当前查询人数过多或服务器响应慢"
+
+    async def _load_from_disk(self, url: str) -> Optional[_CacheEntry]:
+        """内存未命中时从持久化缓存读取，并回填内存缓存"""
+        row = await self.disk.load(url)
+        if row is None:
+            return None
+        group, value, soft_expire, expire, etag, last_modified = row
+        now = time.time()
+        return self.cache.set(url, value, soft_expire - now, group=group, hard_ttl=expire - now,
+                              etag=etag, last_modified=last_modified)
+
+    def payload_version(self, url: str, value: Any) -> Optional[str]:
+        """数据版本（优先ETag，否则为缓存序号）；缓存中的数据已不是value时返回None"""
+        entry = self.cache.peek_entry(url)
+        if entry is None or entry.value is not value:
+            return None
+        return entry.etag or f"#{entry.seq}"
+
+    async def clear_cache(self, group: Optional[str] = None) -> int:
+        """清理内存缓存与持久化缓存，返回清理的内存条目数"""
+        removed = self.cache.clear(group) + self.negative_cache.clear(group)
+        if self.disk is not None:
+            await self.disk.clear(group)
+        return removed
 
-    async def _get(self, url: str, ttl: int, timeout: int = 60) -> Tuple[Optional[Dict[str, Any]], str]:
-        """基础请求方法，修复resp未赋值+超时优化"""
-        cached_data = self.cache.get(url)
+    def _start_flight(self, url: str, ttl: Tuple[int, int], timeout: float, priority: int,
+                      projection: Optional[Dict[str, Any]] = None) -> asyncio.Future:
+        """获取或创建URL对应的进行中请求（交互查询不合并到排队中的后台请求上）
+
+        合并到已有请求时，按本调用方的截止时间延长该请求的截止时间，避免被先发起者较短的截止时间拖累
+        """
+        deadline = time.monotonic() + timeout
+        current = self._inflight.get(url)
+        if current is not None and current[1] <= priority:
+            logger.debug(f"[OWAPI] 合并进行中的请求: {url}")
+            current[2].extend(deadline)
+            return current[0]
+        budget = _FlightBudget(deadline)
+        flight = asyncio.ensure_future(self._fetch(url, ttl, budget, priority, projection))
+        self._inflight[url] = (flight, priority, budget)
+        flight.add_done_callback(lambda f, u=url: self._inflight.pop(u, None) if self._inflight.get(u, (None,))[0] is f else None)
+        return flight
+
+    async def _fetch(self, url: str, ttl: Tuple[int, int], budget: _FlightBudget,
+                     priority: int = PRIORITY_INTERACTIVE,
+                     projection: Optional[Dict[str, Any]] = None) -> Tuple[Optional[Dict[str, Any]], str]:
+        """实际上游请求（携带条件请求头，304视为续期），修复resp未赋值+超时优化"""
+        cached_entry = self.cache.peek_entry(url)
+        cached_data = cached_entry.value if cached_entry is not None else None
+        headers = {}
+        if cached_entry is not None and cached_entry.etag:
+            headers["If-None-Match"] = cached_entry.etag
+        if cached_entry is not None and cached_entry.last_modified:
+            headers["If-Modified-Since"] = cached_entry.last_modified
         resp = None  # 提前初始化resp，避免未赋值引用
-        deadline = time.time() + timeout
         max_attempts = self.max_retries + 1  # 500错误多1次重试
+        endpoint = self._endpoint_name(url)
+        last_outcome = ""  # 上一次尝试的结果（状态码/timeout/error），用于统计重试原因
 
         for attempt in range(1, max_attempts + 1):
+            # 熔断保护：上游故障期间直接降级，不再排队与重试
+            if not self.breaker.allow():
+                if cached_data:
+                    logger.warning(f"[OWAPI] 熔断中，返回缓存数据: {url}")
+                    return cached_data, ""
+                return None, BREAKER_UNAVAILABLE_MSG
+            # 重试预算：重试总量受主请求量约束，避免加重上游负担
+            if attempt == 1:
+                self.retry_budget.record_request()
+            elif not self.retry_budget.can_retry():
+                logger.warning(f"[OWAPI] 重试预算耗尽，停止重试: {url}")
+                break
+            else:
+                self.metrics.inc("owcx_retries_total", endpoint=endpoint, reason=last_outcome)
+
             # 获取限流令牌
-            ok = await self.limiter.acquire(timeout=deadline - time.time())
+            wait_started = time.monotonic()
+            while True:
+                granted_by = budget.deadline
+                ok = await self.scheduler.acquire(priority, timeout=granted_by - time.monotonic())
+                # 等待期间有调用方延长了截止时间，按新的截止时间继续排队
+                if ok or budget.deadline <= granted_by:
+                    break
+            self.metrics.observe("owcx_limiter_wait_seconds", time.monotonic() - wait_started,
+                                 priority="interactive" if priority <= PRIORITY_INTERACTIVE else "background")
             if not ok:
                 if cached_data:
                     logger.warning(f"[OWAPI] 请求超时，返回缓存数据: {url}")
                     return cached_data, ""
                 return None, "请求超时，当前查询人数过多或服务器响应慢"
 
+            # 剩余时间不足以完成一次尝试时不再发起
+            if budget.remaining < ATTEMPT_MIN_TIMEOUT:
+                break
+            started = time.monotonic()
             try:
-                async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                    async with session.get(url) as resp:  # resp仅在此处赋值
-                        logger.info(f"[OWAPI] 请求: {url} | 状态码: {resp.status}")
-
-                        # 成功响应
-                        if resp.status == 200:
-                            data = await resp.json()
-                            self.cache.set(url, data, ttl)
-                            return data, ""
-                        # 404无数据
-                        elif resp.status == 404:
-                            return None, "未找到该玩家或玩家资料未公开"
-                        # 429限流
-                        elif resp.status == 429:
-                            retry_after = int(resp.headers.get("Retry-After", 5))
-                            self.limiter.freeze(retry_after)
-                            return None, f"查询过于频繁，请{retry_after}秒后再试"
-                        # 500错误处理
-                        elif resp.status == 500:
-                            logger.error(f"[OWAPI] 服务器内部错误（500）: {url} | 尝试{attempt}/{max_attempts}")
-                            if attempt == max_attempts:
-                                if cached_data:
-                                    logger.warning(f"[OWAPI] 500错误，返回缓存数据: {url}")
-                                    return cached_data, ""
-                                return None, "服务器暂时无法处理请求（可能是数据同步故障），建议1分钟后重试"
-                            await asyncio.sleep(3)
-                            continue
-                        # 其他错误
-                        else:
-                            return None, f"服务器请求异常（状态码: {resp.status}），请稍后重试"
+                if self.hedge and priority <= PRIORITY_INTERACTIVE:
+                    send = self._send_hedged(url, headers, endpoint)
+                else:
+                    send = self._send(url, headers)
+                resp = await self._within_budget(send, budget)
+                logger.info(f"[OWAPI] 请求: {url} | 状态码: {resp.status}")
+                # 5xx计为上游故障，其余状态码说明上游可正常响应
+                last_outcome = str(resp.status)
+                self._record_attempt(endpoint, last_outcome, resp.status < 500, time.monotonic() - started)
+
+                # 成功响应
+                if resp.status == 200:
+                    data = resp.data
+                    if projection is not None:
+                        data = self._project(data, projection, resp.size)
+                    self._store(url, data, ttl, resp)
+                    self.negative_cache.delete(url)
+                    return data, ""
+                # 304未变化：沿用缓存数据并续期
+                elif resp.status == 304 and cached_entry is not None:
+                    self.revalidated += 1
+                    self._store(url, cached_entry.value, ttl, resp, cached_entry)
+                    return cached_entry.value, ""
+                # 404无数据
+                elif resp.status == 404:
+                    return None, self._cache_negative(url, "未找到该玩家或玩家资料未公开")
+                # 429限流
+                elif resp.status == 429:
+                    retry_after = int(resp.headers.get("Retry-After", 5))
+                    self.limiter.freeze(retry_after)
+                    return None, f"查询过于频繁，请{retry_after}秒后再试"
+                # 500错误处理
+                elif resp.status == 500:
+                    logger.error(f"[OWAPI] 服务器内部错误（500）: {url} | 尝试{attempt}/{max_attempts}")
+                    if attempt == max_attempts:
+                        if cached_data:
+                            logger.warning(f"[OWAPI] 500错误，返回缓存数据: {url}")
+                            return cached_data, ""
+                        return None, "服务器暂时无法处理请求（可能是数据同步故障），建议1分钟后重试"
+                    if 3 >= budget.remaining:
+                        break
+                    await asyncio.sleep(3)
+                    continue
+                # 参数类错误（如标签格式不合法），重试也不会成功
+                elif resp.status in NEGATIVE_CACHE_STATUS:
+                    return None, self._cache_negative(url, f"请求参数无效（状态码: {resp.status}），请检查玩家标签")
+                # 其他错误
+                else:
+                    return None, f"服务器请求异常（状态码: {resp.status}），请稍后重试"
 
+            except _BudgetExpired:
+                # 调用方截止时间已到：不是上游故障，不计入熔断与健康统计
+                last_outcome = "deadline"
+                self.metrics.inc("owcx_upstream_responses_total", endpoint=endpoint, outcome=last_outcome)
+                logger.warning(f"[OWAPI] 已到截止时间，中止请求（尝试{attempt}/{max_attempts}）: {url}")
+                break
             except asyncio.TimeoutError:
+                last_outcome = "timeout"
+                self._record_attempt(endpoint, last_outcome, False, time.monotonic() - started)
                 logger.warning(f"[OWAPI] 超时（尝试{attempt}/{max_attempts}）: {url}")
                 # 超时后直接重试，不访问resp（此时resp为None）
                 backoff = 2 ** attempt
-                if time.time() + backoff >= deadline:
+                if backoff >= budget.remaining:
                     break
                 await asyncio.sleep(backoff)
                 continue
             except Exception as e:
+                last_outcome = "error"
+                self._record_attempt(endpoint, last_outcome, False, time.monotonic() - started)
                 logger.error(f"[OWAPI] 异常（尝试{attempt}/{max_attempts}）: {str(e)} | url={url}")
                 # 其他异常也不访问resp，直接重试
                 backoff = 2 ** attempt
-                if time.time() + backoff >= deadline:
+                if backoff >= budget.remaining:
                     break
                 await asyncio.sleep(backoff)
                 continue
@@ -199,7 +1711,7 @@ class OWAPIClient:
             # 仅当resp存在且非500错误时，执行普通退避（避免resp为None的情况）
             if resp and resp.status != 500:
                 backoff = 2 ** attempt
-                if time.time() + backoff >= deadline:
+                if backoff >= budget.remaining:
                     break
                 await asyncio.sleep(backoff)
 
@@ -209,36 +1721,266 @@ class OWAPIClient:
             return cached_data, ""
         return None, "请求失败（可能是服务器超时或故障），建议稍后重试"
 
+    async def _within_budget(self, coro, budget: _FlightBudget) -> _UpstreamResponse:
+        """在截止时间内等待请求完成（期间截止时间被延长则继续等待），到期则取消并抛出_BudgetExpired"""
+        task = asyncio.ensure_future(coro)
+        try:
+            while True:
+                waited_until = budget.deadline
+                done, _ = await asyncio.wait({task}, timeout=max(0.0, waited_until - time.monotonic()))
+                if done:
+                    return task.result()
+                if budget.deadline <= waited_until:
+                    raise _BudgetExpired()
+        finally:
+            task.cancel()
+
+    async def _send(self, url: str, headers: Dict[str, str]) -> _UpstreamResponse:
+        """发送单个上游请求并读取完整响应（单次尝试的超时上限为客户端超时，截止时间由_within_budget控制）"""
+        session = self._get_session()
+        async with session.get(url, headers=headers) as resp:
+            if resp.status != 200:
+                return _UpstreamResponse(resp.status, resp.headers)
+            body = await resp.read()
+            return _UpstreamResponse(resp.status, resp.headers, json.loads(body), len(body))
+
+    async def _send_hedged(self, url: str, headers: Dict[str, str], endpoint: str) -> _UpstreamResponse:
+        """对冲请求：首个请求超过接口观测p95仍未返回、且限流器有空闲令牌时补发一个，取先返回的结果"""
+        primary = asyncio.ensure_future(self._send(url, headers))
+        delay = self._hedge_delay(endpoint)
+        if delay is None or delay >= self.timeout.total:
+            return await primary
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done or not self.limiter.try_acquire(reserve=HEDGE_RESERVE):
+            return await primary
+        self.hedged += 1
+        self.metrics.inc("owcx_hedged_requests_total", endpoint=endpoint)
+        backup = asyncio.ensure_future(self._send(url, headers))
+        pending = {primary, backup}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    if fut.exception() is None:
+                        if fut is backup:
+                            self.hedge_wins += 1
+                        return fut.result()
+                    error = fut.exception()
+            raise error
+        finally:
+            primary.cancel()
+            backup.cancel()
+
+    def _hedge_delay(self, endpoint: str) -> Optional[float]:
+        """对冲触发延迟：该接口延迟直方图的p95（样本不足时返回None，不对冲）"""
+        hist = self.metrics.histograms.get(Metrics._key("owcx_upstream_request_seconds", {"endpoint": endpoint}))
+        if hist is None or hist.count < HEDGE_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY, hist.percentile(0.95))
+
+    def _record_attempt(self, endpoint: str, outcome: str, success: bool, latency: float):
+        """记录单次上游调用结果（熔断统计+指标）"""
+        self.breaker.record(success, latency)
+        self.health.record(success, latency, outcome)
+        self.metrics.observe("owcx_upstream_request_seconds", latency, endpoint=endpoint)
+        self.metrics.inc("owcx_upstream_responses_total", endpoint=endpoint, outcome=outcome)
+
+    @staticmethod
+    def _endpoint_name(url: str) -> str:
+        """接口名称（用于指标标签），如summary/stats_summary/stats_career/heroes"""
+        parts = urlparse(url).path.strip("/").split("/")
+        if parts[0] == "players" and len(parts) > 2:
+            return "_".join(parts[2:])
+        return parts[0]
+
+    def _store(self, url: str, data: Any, ttl: Tuple[int, int], resp: _UpstreamResponse,
+               previous: Optional[_CacheEntry] = None):
+        """写入内存缓存与持久化缓存（TTL可由上游缓存头覆盖，保存校验头）"""
+        soft_ttl, hard_ttl = ttl
+        upstream_ttl = self._upstream_ttl(resp) if self.honor_cache_headers else None
+        if upstream_ttl is not None:
+            if upstream_ttl > 0:
+                soft_ttl = max(UPSTREAM_TTL_MIN, upstream_ttl)
+            else:
+                # no-store/no-cache/max-age=0/已过期：立即视为陈旧，下次访问时重新验证
+                # （内存中保留旧值仅用于条件请求与故障降级，no-store的响应不落盘）
+                soft_ttl = 0
+            hard_ttl = max(hard_ttl, soft_ttl)
+        etag = resp.headers.get("ETag") or (previous.etag if previous else None)
+        last_modified = resp.headers.get("Last-Modified") or (previous.last_modified if previous else None)
+        group = self._cache_group(url)
+        entry = self.cache.set(url, data, soft_ttl, group=group, hard_ttl=hard_ttl,
+                               etag=etag, last_modified=last_modified)
+        if self.disk is not None and "no-store" not in resp.headers.get("Cache-Control", "").lower():
+            self.disk.store(url, group, data, entry.soft_expire, entry.expire, etag, last_modified)
+
+    @staticmethod
+    def _upstream_ttl(resp: _UpstreamResponse) -> Optional[int]:
+        """解析上游Cache-Control的max-age或Expires，返回建议TTL（秒），0表示需立即重新验证"""
+        directives: Dict[str, str] = {}
+        for directive in resp.headers.get("Cache-Control", "").split(","):
+            name, _, value = directive.strip().partition("=")
+            directives[name.lower()] = value.strip().strip('"')
+        # no-store/no-cache：每次使用前都需重新验证（private只约束共享缓存，本客户端缓存为私有缓存，不受其限制）
+        if "no-store" in directives or "no-cache" in directives:
+            return 0
+        max_age = directives.get("max-age", "")
+        if max_age.isdigit():
+            return int(max_age)
+        expires = resp.headers.get("Expires")
+        if expires:
+            try:
+                expires_at = parsedate_to_datetime(expires)
+            except (TypeError, ValueError):
+                return None
+            # 不带时区（如"-0000"）的日期按UTC处理
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            return max(0, int(expires_at.timestamp() - time.time()))
+        return None
+
+    def _cache_negative(self, url: str, err_msg: str) -> str:
+        """记录确定性失败到负缓存，返回错误提示"""
+        self.negative_cache.set(url, err_msg, NEGATIVE_CACHE_TTL, group=self._cache_group(url))
+        return err_msg
+
+    def _project(self, data: Any, projection: Dict[str, Any], raw_size: int) -> Any:
+        """裁剪响应字段，并统计裁剪前后的数据量（原始大小取响应体字节数，避免重新序列化）"""
+        projected = project_fields(data, projection)
+        self.raw_bytes += raw_size
+        self.projected_bytes += LRUCache._estimate_size(projected)
+        return projected
+
+    @staticmethod
+    def _cache_group(url: str) -> str:
+        """缓存分组（取URL路径首段，如players/heroes）"""
+        return urlparse(url).path.strip("/").split("/", 1)[0]
+
     def _format_tag(self, tag: str) -> str:
         """格式化玩家标签（#替换为-）"""
         return tag.replace("#", "-")
 
-    async def get_summary(self, tag: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    def _summary_endpoint(self, tag: str) -> Tuple[str, Tuple[int, int], Dict[str, Any]]:
+        """玩家概要接口：(URL, TTL, 裁剪规则)"""
+        url = f"{self.api_base}/players/{self._format_tag(tag)}/summary"
+        return url, CACHE_TTL["summary"], PROJECTION["summary"]
+
+    def _mode_endpoint(self, tag: str, gamemode: str) -> Tuple[str, Tuple[int, int], Dict[str, Any]]:
+        """模式统计接口：(URL, TTL, 裁剪规则)"""
+        url = f"{self.api_base}/players/{self._format_tag(tag)}/stats/summary?gamemode={gamemode}"
+        ttl_key = "comp_summary" if gamemode == "competitive" else "qp_summary"
+        return url, CACHE_TTL[ttl_key], PROJECTION["mode_summary"]
+
+    async def get_summary(self, tag: str, priority: int = PRIORITY_INTERACTIVE,
+                          deadline: Optional[float] = None) -> Tuple[Optional[Dict[str, Any]], str]:
         """获取玩家概要信息（段位等）"""
-        formatted_tag = self._format_tag(tag)
-        url = f"{OW_API}/players/{formatted_tag}/summary"
-        return await self._get(url, CACHE_TTL["summary"])
+        url, ttl, projection = self._summary_endpoint(tag)
+        data, err_msg = await self._get(url, ttl, priority=priority, projection=projection, deadline=deadline)
+        if data and not err_msg and self.history is not None:
+            self.history.record_summary(tag, data)
+        return data, err_msg
 
-    async def get_mode_summary(self, tag: str, gamemode: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    async def get_mode_summary(self, tag: str, gamemode: str, priority: int = PRIORITY_INTERACTIVE,
+                               deadline: Optional[float] = None) -> Tuple[Optional[Dict[str, Any]], str]:
         """获取指定模式的统计信息"""
-        formatted_tag = self._format_tag(tag)
-        url = f"{OW_API}/players/{formatted_tag}/stats/summary?gamemode={gamemode}"
-        ttl_key = "comp_summary" if gamemode == "competitive" else "qp_summary"
-        return await self._get(url, CACHE_TTL[ttl_key])
+        url, ttl, projection = self._mode_endpoint(tag, gamemode)
+        data, err_msg = await self._get(url, ttl, priority=priority, projection=projection, deadline=deadline)
+        if data and not err_msg and self.history is not None:
+            self.history.record_mode(tag, gamemode, data)
+        return data, err_msg
+
+    async def prefetch_player(self, tag: str, lead: float, budget: int) -> int:
+        """后台预取：刷新即将过期（软TTL剩余不足lead秒）的概要与模式数据，返回发起的上游请求数"""
+        endpoints = [
+            self._summary_endpoint(tag),
+            self._mode_endpoint(tag, "competitive"),
+            self._mode_endpoint(tag, "quickplay"),
+        ]
+        refreshed = 0
+        now = time.time()
+        for url, ttl, projection in endpoints:
+            if refreshed >= budget:
+                break
+            entry = self.cache.peek_entry(url)
+            if entry is not None and entry.soft_expire - now > lead:
+                continue
+            if self.negative_cache.peek(url) is not None:
+                continue
+            refreshed += 1
+            await asyncio.shield(self._start_flight(url, ttl, 60, PRIORITY_BACKGROUND, projection))
+        return refreshed
+
+    def _career_url(self, tag: str, gamemode: str) -> str:
+        """生涯数据接口URL"""
+        return f"{self.api_base}/players/{self._format_tag(tag)}/stats/career?gamemode={gamemode}"
+
+    def data_version(self, kind: str, tag: str, value: Any, gamemode: str = DEFAULT_MODE) -> Optional[str]:
+        """查询结果对应的数据版本（kind: summary/mode/career），用于渲染结果缓存的键"""
+        if kind == "summary":
+            url = self._summary_endpoint(tag)[0]
+        elif kind == "mode":
+            url = self._mode_endpoint(tag, gamemode)[0]
+        else:
+            url = self._career_url(tag, gamemode)
+        return self.payload_version(url, value)
+
+    async def probe(self) -> bool:
+        """后台健康探测：低优先级直接请求上游（不读缓存），结果计入被动健康统计"""
+        url, ttl, projection = self._summary_endpoint(HEALTH_PROBE_TAG)
+        self.health.last_probe = time.monotonic()
+        data, err_msg = await asyncio.shield(
+            self._start_flight(url, ttl, HEALTH_PROBE_TIMEOUT, PRIORITY_BACKGROUND, projection)
+        )
+        return bool(data) and not err_msg
+
+    async def get_career_stats(self, tag: str, gamemode: str = DEFAULT_MODE, priority: int = PRIORITY_INTERACTIVE,
+                               deadline: Optional[float] = None) -> Tuple[Optional[Dict[str, Any]], str]:
+        """获取全部英雄的生涯数据（一次请求+一条缓存覆盖所有英雄）"""
+        url = self._career_url(tag, gamemode)
+        return await self._get(url, CACHE_TTL["hero_stats"], priority=priority, projection=PROJECTION["career"],
+                               deadline=deadline)
+
+    async def get_hero_catalog(self, locale: str,
+                               priority: int = PRIORITY_BACKGROUND) -> Tuple[Optional[List[Dict[str, Any]]], str]:
+        """获取指定语言的英雄列表（长TTL，随持久化缓存保存）"""
+        url = f"{self.api_base}/heroes?locale={locale}"
+        return await self._get(url, CACHE_TTL["heroes"], priority=priority, projection=PROJECTION["heroes"])
 
-    async def get_hero_stats(self, tag: str, hero_key: str, gamemode: str = DEFAULT_MODE) -> Tuple[Optional[Dict[str, Any]], str]:
-        """获取指定英雄的详细数据（默认休闲模式）"""
-        formatted_tag = self._format_tag(tag)
-        url = f"{OW_API}/players/{formatted_tag}/stats/career?gamemode={gamemode}&hero={hero_key}"
-        return await self._get(url, CACHE_TTL["hero_stats"])
+    async def load_hero_catalog(self) -> int:
+        """拉取多语言英雄目录并合并进解析器，返回新增的英雄数（失败时沿用内置映射）"""
+        if time.monotonic() < self._catalog_retry_at:
+            return 0
+        catalog: Dict[str, List[str]] = {}
+        for locale in HERO_CATALOG_LOCALES:
+            heroes, err_msg = await self.get_hero_catalog(locale)
+            if err_msg or not isinstance(heroes, list):
+                logger.warning(f"[OWAPI] 英雄目录加载失败({locale})，沿用内置英雄表: {err_msg}")
+                self._catalog_retry_at = time.monotonic() + HERO_CATALOG_RETRY
+                return 0
+            for hero in heroes:
+                key, name = hero.get("key"), hero.get("name")
+                if key and name:
+                    catalog.setdefault(key, []).append(name)
+        if catalog == self._hero_catalog:
+            return 0
+        self._hero_catalog = catalog
+        added = HERO_RESOLVER.merge_catalog(catalog)
+        if added:
+            logger.info(f"[OWAPI] 英雄目录新增 {added} 个英雄，当前共 {len(HERO_RESOLVER)} 个")
+        return added
 
     def search_hero_key(self, hero_name: str) -> Optional[str]:
-        """根据英雄中文名查找hero_key（不区分大小写）"""
-        hero_name_lower = hero_name.strip().lower()
-        for name, key in HERO_NAME_TO_KEY.items():
-            if name.lower() == hero_name_lower or key == hero_name_lower:
-                return key
-        return None
+        """根据英雄名/别名/拼音/唯一前缀查找hero_key（不区分大小写）"""
+        return HERO_RESOLVER.resolve(hero_name)
+
+    def suggest_heroes(self, hero_name: str, limit: int = 3) -> List[str]:
+        """未找到英雄时给出最接近的候选名"""
+        return HERO_RESOLVER.suggest(hero_name, limit)
 
 # ---------- 格式化工具 ----------
 class FormatTool:
@@ -318,40 +2060,223 @@ class FormatTool:
             f"　单局最高伤害: {best_damage:.0f} | 最佳多杀: {best_multikill}"
         )
 
+# 帮助文本（常量，模块加载时生成一次）
+HELP_TEXT = (
+    f"🎮 守望先锋2 亚服战绩查询插件（v1.2.1）\n"
+    f"==============================\n"
+    f"📌 说明：默认查询{DEFAULT_MODE_CN}模式，可显式指定“竞技”切换\n"
+    f"🔍 基础查询：\n"
+    f"  /ow 玩家#12345 [pc/console] - 查指定玩家战绩（含竞技+休闲）\n"
+    f"  /ow - 查已绑定账号战绩\n"
+    f"\n"
+    f"🦸 英雄查询（默认{DEFAULT_MODE_CN}）：\n"
+    f"  1. 已绑定账号：/ow英雄 英雄名 [英雄名...] [竞技/休闲]\n"
+    f"     示例：/ow英雄 源氏（默认休闲）| /ow英雄 源氏 安娜 竞技\n"
+    f"  2. 未绑定账号：/ow英雄 英雄名 玩家#12345 [竞技/休闲]\n"
+    f"     示例：/ow英雄 安娜 玩家#12345 休闲\n"
+    f"\n"
+    f"🔧 账号管理：\n"
+    f"  /ow绑定 玩家#12345 - 绑定账号\n"
+    f"  /ow解绑 - 解绑账号\n"
+    f"\n"
+    f"📈 战绩趋势（基于本地历史记录，不额外请求API）：\n"
+    f"  /ow趋势 [玩家#12345] [竞技/休闲] [pc/console] [天数] - 查看近期场次、胜率与数据变化\n"
+    f"\n"
+    f"🏅 群排行：\n"
+    f"  /ow排行 [坦克/输出/支援] [pc/console] - 本群已绑定账号段位排行\n"
+    f"  /ow排行 玩家#12345 玩家#23456 ... - 指定玩家排行\n"
+    f"\n"
+    f"💡 管理员命令：\n"
+    f"  /ow清理缓存 [全部] - 清理查询缓存\n"
+    f"  /ow状态 详细 - 查看运行指标（延迟/缓存/限流等）\n"
+    f"📌 提示：若{DEFAULT_MODE_CN}模式超时，可延长等待或切换竞技模式"
+)
+
 # ---------- 插件主类（默认休闲模式） ----------
 @register("astrbot_plugin_owcx", "tzyc", "国际服 OW2 数据查询", "v1.2.1")
 class OWStatsPlugin(Star):
     def __init__(self,** kwargs):
         super().__init__(kwargs.get("context"))
-        self.client = OWAPIClient()
+        self.config = kwargs.get("config") or {}
+        self.client = OWAPIClient(
+            pool_limit=int(self.config.get("pool_limit", POOL_LIMIT)),
+            pool_limit_per_host=int(self.config.get("pool_limit_per_host", POOL_LIMIT_PER_HOST)),
+            keepalive_timeout=float(self.config.get("keepalive_timeout", KEEPALIVE_TIMEOUT)),
+            cache_max_entries=int(self.config.get("cache_max_entries", CACHE_MAX_ENTRIES)),
+            cache_max_bytes=int(float(self.config.get("cache_max_mb", CACHE_MAX_BYTES / 1024 / 1024)) * 1024 * 1024),
+            disk_cache=DiskCache(Path(DISK_CACHE_FILE)) if self.config.get("persist_cache", True) else None,
+            honor_cache_headers=bool(self.config.get("honor_cache_headers", True)),
+            api_base=str(self.config.get("api_base", "") or OW_API),
+            rate=float(self.config.get("rate_limit", RATE_LIMIT)),
+            burst=int(self.config.get("rate_burst", RATE_BURST)),
+            history=HistoryStore(Path(HISTORY_FILE)) if self.config.get("history_enabled", True) else None,
+            hedge=bool(self.config.get("hedge_enabled", False)),
+        )
+        self.query_deadline = float(self.config.get("query_deadline", QUERY_DEADLINE))
         self.format_tool = FormatTool()
+        # 渲染结果缓存（键包含数据版本，数据刷新后自动失效）
+        self.reply_cache = LRUCache(max_entries=REPLY_CACHE_MAX_ENTRIES)
         # 绑定文件管理
         self.bind_file = Path("data/ow_stats_bind.json")
         self.bind_file.parent.mkdir(parents=True, exist_ok=True)
+        self.bind_store = JsonFileStore(self.bind_file)
         self.bind_data = self._load_bind_data()
+        # 群成员记录（群号 -> QQ列表），用于/ow排行汇总本群已绑定账号
+        self.group_store = JsonFileStore(Path("data/ow_stats_bind_groups.json"))
+        self.group_members = self._load_group_members()
+        self.leaderboard_max_tags = int(self.config.get("leaderboard_max_tags", LEADERBOARD_MAX_TAGS))
+        self.leaderboard_concurrency = int(self.config.get("leaderboard_concurrency", LEADERBOARD_CONCURRENCY))
+        self.leaderboard_deadline = float(self.config.get("leaderboard_deadline", LEADERBOARD_DEADLINE))
+        # 后台任务（首次收到命令时启动，避免初始化时无事件循环）
+        self._tag_activity: Dict[str, float] = {}  # 玩家标签 -> 最近查询时间
+        self._background_tasks: List[asyncio.Task] = []
+        self._background_started = False
+        self._hero_catalog_task: Optional[asyncio.Task] = None
+        self.prefetch_enabled = bool(self.config.get("prefetch_enabled", False))
+        self.prefetch_interval = float(self.config.get("prefetch_interval", PREFETCH_INTERVAL))
+        self.prefetch_recency = float(self.config.get("prefetch_recency_hours", PREFETCH_RECENCY_HOURS)) * 3600
+        self.prefetch_budget = int(self.config.get("prefetch_budget", PREFETCH_BUDGET))
+        self.prefetch_lead = float(self.config.get("prefetch_lead", PREFETCH_LEAD))
+        self.prefetch_requests = 0
+        # 命令准入控制（可关闭）
+        self.admission = AdmissionController(
+            user_rate=float(self.config.get("admission_user_rate", ADMISSION_USER_RATE)),
+            user_burst=int(self.config.get("admission_user_burst", ADMISSION_USER_BURST)),
+            group_rate=float(self.config.get("admission_group_rate", ADMISSION_GROUP_RATE)),
+            group_burst=int(self.config.get("admission_group_burst", ADMISSION_GROUP_BURST)),
+            max_inflight=int(self.config.get("admission_max_inflight", ADMISSION_MAX_INFLIGHT)),
+        ) if self.config.get("admission_enabled", True) else None
+        self.health_probe_interval = float(self.config.get("health_probe_interval", HEALTH_PROBE_INTERVAL))
+        self.metrics_dump_path = str(self.config.get("metrics_dump_path", "") or "")
+        self.metrics_dump_format = str(self.config.get("metrics_dump_format", "prometheus"))
 
     # ---------- 绑定数据管理 ----------
     def _load_bind_data(self) -> Dict[str, str]:
         """加载绑定数据"""
-        if self.bind_file.exists():
-            try:
-                return json.loads(self.bind_file.read_text(encoding="utf-8"))
-            except Exception as e:
-                logger.error(f"加载绑定数据失败: {str(e)}")
+        try:
+            return self.bind_store.load()
+        except Exception as e:
+            logger.error(f"加载绑定数据失败: {str(e)}")
         return {}
 
     def _save_bind_data(self):
-        """保存绑定数据"""
+        """保存绑定数据（延迟合并后异步原子写入）"""
+        self.bind_store.schedule_save(self.bind_data)
+
+    def _load_group_members(self) -> Dict[str, List[str]]:
+        """加载群成员记录"""
         try:
-            self.bind_file.write_text(
-                json.dumps(self.bind_data, ensure_ascii=False, indent=2),
-                encoding="utf-8"
-            )
+            return self.group_store.load()
         except Exception as e:
-            logger.error(f"保存绑定数据失败: {str(e)}")
+            logger.error(f"加载群成员记录失败: {str(e)}")
+        return {}
+
+    def _note_group_member(self, event: AstrMessageEvent):
+        """记录发送者所在的群（私聊忽略），有变化时延迟写入"""
+        group_id = str(event.get_group_id() or "")
+        if not group_id:
+            return
+        qq = str(event.get_sender_id())
+        members = self.group_members.setdefault(group_id, [])
+        if qq not in members:
+            members.append(qq)
+            self.group_store.schedule_save(self.group_members)
+
+    # ---------- 后台任务 ----------
+    def _ensure_background_tasks(self):
+        """按配置启动后台任务（仅启动一次）"""
+        if self._background_started:
+            return
+        self._background_started = True
+        self._hero_catalog_task = asyncio.ensure_future(self.client.load_hero_catalog())
+        self._background_tasks.append(self._hero_catalog_task)
+        if self.prefetch_enabled:
+            self._background_tasks.append(asyncio.ensure_future(self._prefetch_loop()))
+        if self.metrics_dump_path:
+            self._background_tasks.append(asyncio.ensure_future(self._metrics_dump_loop()))
+        if self.health_probe_interval > 0:
+            self._background_tasks.append(asyncio.ensure_future(self._health_probe_loop()))
+
+    def _touch_tag(self, tag: str):
+        """记录玩家标签的最近查询时间（供预取判断活跃度），并按需启动后台任务"""
+        self._tag_activity[tag] = time.monotonic()
+        self._ensure_background_tasks()
+
+    async def _prefetch_loop(self):
+        """定时预取近期活跃的已绑定账号数据（低优先级，受限流与预算约束）"""
+        logger.info("[OW预取] 后台预取已启动")
+        while True:
+            await asyncio.sleep(self.prefetch_interval)
+            try:
+                await self._prefetch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[OW预取] 预取异常: {str(e)}")
+
+    async def _prefetch_once(self) -> int:
+        """执行一轮预取，返回发起的上游请求数"""
+        now = time.monotonic()
+        # 清理过期的活跃记录
+        for tag in [t for t, ts in self._tag_activity.items() if now - ts > self.prefetch_recency]:
+            self._tag_activity.pop(tag, None)
+        bound_tags = set(self.bind_data.values())
+        candidates = sorted(
+            (tag for tag in self._tag_activity if tag in bound_tags),
+            key=lambda t: self._tag_activity[t], reverse=True
+        )
+        budget = self.prefetch_budget
+        for tag in candidates:
+            if budget <= 0:
+                break
+            budget -= await self.client.prefetch_player(tag, self.prefetch_lead, budget)
+        used = self.prefetch_budget - budget
+        self.prefetch_requests += used
+        if used:
+            logger.info(f"[OW预取] 本轮预取请求 {used} 次")
+        return used
+
+    async def _health_probe_loop(self):
+        """定时低优先级探测上游（期间已有上游调用时跳过，被动统计已足够）"""
+        health = self.client.health
+        while True:
+            await asyncio.sleep(self.health_probe_interval)
+            last = health.last_activity
+            if last is not None and time.monotonic() - last < self.health_probe_interval:
+                continue
+            try:
+                ok = await self.client.probe()
+                logger.debug(f"[OWAPI] 健康探测: {'正常' if ok else '异常'}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[OWAPI] 健康探测异常: {str(e)}")
+
+    async def _metrics_dump_loop(self):
+        """定时将运行指标导出到文件（Prometheus文本或JSON）"""
+        path = Path(self.metrics_dump_path)
+        while True:
+            await asyncio.sleep(METRICS_DUMP_INTERVAL)
+            try:
+                await self._dump_metrics(path)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[OW指标] 导出指标失败: {str(e)}")
+
+    async def _dump_metrics(self, path: Path):
+        """导出一次运行指标（序列化在事件循环中完成，写文件在线程中完成）"""
+        metrics = self.client.metrics
+        if self.metrics_dump_format == "json":
+            text = json.dumps(metrics.to_json(), ensure_ascii=False)
+        else:
+            text = metrics.to_prometheus()
+        await asyncio.get_running_loop().run_in_executor(None, write_atomic, path, text)
 
     # ---------- 核心命令（默认休闲模式） ----------
     @filter.command("ow")
+    @instrumented("ow")
+    @admitted("ow")
     async def ow_stats_query(self, event: AstrMessageEvent):
         """战绩查询主命令（含竞技+休闲）"""
         args = event.message_str.strip().removeprefix("ow").strip().split()
@@ -365,6 +2290,7 @@ class OWStatsPlugin(Star):
             if not tag:
                 yield event.plain_result("请先绑定账号或直接查询：\n/ow 玩家#12345 [pc/console]")
                 return
+            self._note_group_member(event)
         elif len(args) == 1:
             tag = args[0]
         elif len(args) == 2 and args[1] in ["pc", "console"]:
@@ -378,25 +2304,47 @@ class OWStatsPlugin(Star):
             yield event.plain_result("玩家标签格式错误！\n示例：/ow 玩家#12345")
             return
         
+        self._touch_tag(tag)
         yield event.plain_result(f"🔍 正在查询 {tag}（{platform}平台）...")
         
         try:
-            # 并行请求竞技+休闲数据
-            summary_task = self.client.get_summary(tag)
-            comp_task = self.client.get_mode_summary(tag, "competitive")
-            qp_task = self.client.get_mode_summary(tag, "quickplay")
-            
-            summary, summary_err = await summary_task
-            comp_stats, comp_err = await comp_task
-            qp_stats, qp_err = await qp_task
+            # 并发请求概要+竞技+休闲数据，共享同一截止时间（同时传给客户端，约束限流等待、重试与HTTP超时）
+            deadline = time.monotonic() + self.query_deadline
+            sections = await self._fetch_sections({
+                "summary": self.client.get_summary(tag, deadline=deadline),
+                "comp": self.client.get_mode_summary(tag, "competitive", deadline=deadline),
+                "qp": self.client.get_mode_summary(tag, "quickplay", deadline=deadline),
+            }, self.query_deadline)
+            summary, summary_err = sections["summary"]
+            comp_stats, comp_err = sections["comp"]
+            qp_stats, qp_err = sections["qp"]
             
-            if summary_err:
+            # 概要明确失败（非超时）时直接返回错误
+            if summary_err and summary_err != SECTION_TIMEOUT_MSG:
                 yield event.plain_result(f"❌ {summary_err}")
                 return
             
-            # 解析段位+格式化数据
-            role_lines = self._parse_division_data(summary, platform)
-            season_hint = self._get_season_hint(summary, platform, comp_stats)
+            # 数据版本未变时直接复用上次渲染结果
+            reply_key = None
+            if not (summary_err or comp_err or qp_err):
+                reply_key = self._reply_key(
+                    "ow", tag, platform,
+                    self.client.data_version("summary", tag, summary),
+                    self.client.data_version("mode", tag, comp_stats, "competitive"),
+                    self.client.data_version("mode", tag, qp_stats, "quickplay"),
+                )
+            cached_reply = self.reply_cache.get(reply_key) if reply_key else None
+            if cached_reply is not None:
+                yield event.plain_result(cached_reply)
+                return
+
+            # 解析段位+格式化数据（概要超时则标记缺失，仍展示已返回的模式数据）
+            if summary:
+                role_lines = self._parse_division_data(summary, platform)
+                season_hint = self._get_season_hint(summary, platform, comp_stats)
+            else:
+                role_lines = [f"⏱️ {SECTION_TIMEOUT_MSG}"]
+                season_hint = ""
             comp_block = self._format_mode_block(comp_stats, comp_err, "竞技")
             qp_block = self._format_mode_block(qp_stats, qp_err, "休闲")
             
@@ -407,6 +2355,8 @@ class OWStatsPlugin(Star):
                 f"{season_hint}\n"
                 f"{comp_block}\n\n{qp_block}"
             )
+            if reply_key:
+                self.reply_cache.set(reply_key, result_msg, REPLY_CACHE_TTL, group="reply")
             
             yield event.plain_result(result_msg)
             
@@ -415,14 +2365,20 @@ class OWStatsPlugin(Star):
             yield event.plain_result("❌ 查询异常，请稍后重试")
 
     @filter.command("ow英雄")
+    @instrumented("ow英雄")
+    @admitted("ow英雄")
     async def ow_hero_stats(self, event: AstrMessageEvent):
-        """英雄详细数据查询（默认休闲模式+错误优化）"""
-        args = event.message_str.strip().removeprefix("ow英雄").strip().split()
+        """英雄详细数据查询（默认休闲模式，支持一次查询多个英雄）"""
+        raw_args = event.message_str.strip().removeprefix("ow英雄").strip()
+        args = [a for a in re.split(r"[\s,，、]+", raw_args) if a]
         qq = str(event.get_sender_id())
         tag = ""
-        hero_name = ""
         gamemode = DEFAULT_MODE
         gamemode_cn = DEFAULT_MODE_CN
+        usage = (
+            f"1. 已绑定：/ow英雄 英雄名 [英雄名...] [竞技/休闲]（默认{DEFAULT_MODE_CN}）\n"
+            f"2. 未绑定：/ow英雄 英雄名 [英雄名...] 玩家#12345 [竞技/休闲]"
+        )
 
         # 步骤1：解析模式参数
         if len(args) >= 1 and args[-1] in MODE_CN_TO_EN.keys():
@@ -430,59 +2386,128 @@ class OWStatsPlugin(Star):
             gamemode_cn = args[-1]
             args = args[:-1]
 
-        # 步骤2：解析英雄名和玩家标签
+        # 步骤2：解析英雄名列表和玩家标签
         if len(args) >= 2 and "#" in args[-1]:
-            hero_name = " ".join(args[:-1])
+            hero_names = args[:-1]
             tag = args[-1]
-        elif len(args) == 1:
-            hero_name = args[0]
+        elif len(args) >= 1 and "#" not in args[-1]:
+            hero_names = args
             tag = self.bind_data.get(qq)
             if not tag:
-                yield event.plain_result(
-                    f"请先绑定账号或指定查询：\n"
-                    f"1. 已绑定：/ow英雄 英雄名 [竞技/休闲]（默认{DEFAULT_MODE_CN}）\n"
-                    f"2. 未绑定：/ow英雄 英雄名 玩家#12345 [竞技/休闲]"
-                )
+                yield event.plain_result(f"请先绑定账号或指定查询：\n{usage}")
                 return
+            self._note_group_member(event)
         else:
             yield event.plain_result(
-                "参数格式错误！\n正确格式：\n"
-                f"1. 已绑定：/ow英雄 英雄名 [竞技/休闲]（默认{DEFAULT_MODE_CN}）\n"
-                f"2. 未绑定：/ow英雄 英雄名 玩家#12345 [竞技/休闲]\n"
-                f"示例：/ow英雄 源氏（默认休闲）| /ow英雄 源氏 竞技"
+                f"参数格式错误！\n正确格式：\n{usage}\n"
+                f"示例：/ow英雄 源氏（默认休闲）| /ow英雄 源氏 安娜 竞技"
             )
             return
+        hero_names = list(dict.fromkeys(hero_names))[:MAX_HEROES_PER_QUERY]
         
-        # 步骤3：查找英雄key
-        hero_key = self.client.search_hero_key(hero_name)
-        if not hero_key:
-            yield event.plain_result(f"❌ 未找到英雄：{hero_name}\n支持英雄：{', '.join(HERO_NAME_TO_KEY.keys())}")
+        # 步骤3：查找英雄key（未命中时等待英雄目录加载后再试一次，以识别新英雄）
+        self._ensure_background_tasks()
+        heroes, unknown = self._resolve_heroes(hero_names)
+        if unknown and await self._refresh_hero_catalog():
+            heroes, unknown = self._resolve_heroes(hero_names)
+        if not heroes:
+            yield event.plain_result(f"❌ 未找到英雄：{'、'.join(unknown)}\n{self._hero_suggestion(unknown)}")
             return
+        hero_label = "、".join(name for name, _ in heroes)
+        self._touch_tag(tag)
         
-        # 步骤4：请求数据
-        logger.info(f"[OW英雄查询] tag={tag}, hero={hero_name}, mode={gamemode_cn}")
-        yield event.plain_result(f"🔍 正在查询 {tag} 的 {hero_name} {gamemode_cn}模式数据...")
-        hero_data, err_msg = await self.client.get_hero_stats(tag, hero_key, gamemode)
+        # 步骤4：请求数据（一次生涯数据请求覆盖全部英雄）
+        logger.info(f"[OW英雄查询] tag={tag}, heroes={hero_label}, mode={gamemode_cn}")
+        yield event.plain_result(f"🔍 正在查询 {tag} 的 {hero_label} {gamemode_cn}模式数据...")
+        career, err_msg = await self.client.get_career_stats(
+            tag, gamemode, deadline=time.monotonic() + self.query_deadline
+        )
         
         # 步骤5：错误处理（区分超时和其他错误）
         if err_msg:
             # 超时场景提示优化
             if "请求超时" in err_msg:
-                err_msg += f"\n💡 提示：服务器响应较慢，可1分钟后再试，或切换竞技模式（/ow英雄 {hero_name} 竞技）"
+                err_msg += f"\n💡 提示：服务器响应较慢，可1分钟后再试，或切换竞技模式（/ow英雄 {hero_label} 竞技）"
             elif gamemode == "quickplay" and "服务器暂时无法处理请求" in err_msg:
-                err_msg += f"\n💡 备选方案：尝试查询 {hero_name} 竞技模式，命令：/ow英雄 {hero_name} 竞技"
-            logger.error(f"[OW英雄查询失败] tag={tag}, hero={hero_name}, mode={gamemode_cn} | 错误: {err_msg}")
+                err_msg += f"\n💡 备选方案：尝试查询 {hero_label} 竞技模式，命令：/ow英雄 {hero_label} 竞技"
+            logger.error(f"[OW英雄查询失败] tag={tag}, heroes={hero_label}, mode={gamemode_cn} | 错误: {err_msg}")
             yield event.plain_result(f"❌ {err_msg}")
             return
-        if not hero_data:
+        
+        # 步骤6：逐个英雄判空与格式化，合并为一条回复（数据版本未变时复用上次渲染结果）
+        reply_key = self._reply_key(
+            "ow英雄", tag, gamemode, ",".join(f"{name}={hero_key}" for name, hero_key in heroes),
+            self.client.data_version("career", tag, career, gamemode),
+        )
+        hero_reply = self.reply_cache.get(reply_key) if reply_key else None
+        if hero_reply is None:
+            hero_reply = "\n\n".join(
+                self._format_hero_block(career or {}, name, hero_key, tag, gamemode, gamemode_cn)
+                for name, hero_key in heroes
+            )
+            if reply_key:
+                self.reply_cache.set(reply_key, hero_reply, REPLY_CACHE_TTL, group="reply")
+        blocks = [hero_reply]
+        if unknown:
+            blocks.append(f"⚠️ 未识别的英雄：{'、'.join(unknown)}\n{self._hero_suggestion(unknown)}")
+        
+        # 步骤7：输出结果
+        yield event.plain_result("\n\n".join(blocks))
+
+    @staticmethod
+    def _reply_key(*parts: Optional[str]) -> Optional[str]:
+        """渲染结果缓存键（任一部分缺失时返回None，表示不缓存）"""
+        if any(part is None for part in parts):
+            return None
+        return "|".join(parts)
+
+    def _resolve_heroes(self, hero_names: List[str]) -> Tuple[List[Tuple[str, str]], List[str]]:
+        """解析英雄名列表，返回 ([(显示名, hero_key)], [未识别名称])，同一英雄的不同写法只保留一次"""
+        heroes = []
+        unknown = []
+        for name in hero_names:
+            hero_key = self.client.search_hero_key(name)
+            if hero_key:
+                if all(key != hero_key for _, key in heroes):
+                    heroes.append((HERO_RESOLVER.display_names.get(hero_key, name), hero_key))
+            else:
+                unknown.append(name)
+        return heroes, unknown
+
+    async def _refresh_hero_catalog(self) -> bool:
+        """等待英雄目录加载（最多HERO_CATALOG_WAIT秒），返回是否有新增英雄"""
+        task = self._hero_catalog_task
+        if task is None or task.done():
+            task = self._hero_catalog_task = asyncio.ensure_future(self.client.load_hero_catalog())
+        try:
+            return bool(await asyncio.wait_for(asyncio.shield(task), HERO_CATALOG_WAIT))
+        except asyncio.TimeoutError:
+            return False
+        except Exception as e:
+            logger.warning(f"[OW英雄查询] 英雄目录加载异常: {str(e)}")
+            return False
+
+    def _hero_suggestion(self, unknown: List[str]) -> str:
+        """生成未识别英雄的候选提示（无候选时列出全部支持英雄）"""
+        suggestions = []
+        for name in unknown:
+            for candidate in self.client.suggest_heroes(name):
+                if candidate not in suggestions:
+                    suggestions.append(candidate)
+        if suggestions:
+            return f"💡 你是不是要找：{'、'.join(suggestions)}"
+        return f"支持英雄：{', '.join(HERO_RESOLVER.display_names.values())}"
+
+    def _format_hero_block(self, career: Dict[str, Any], hero_name: str, hero_key: str,
+                           tag: str, gamemode: str, gamemode_cn: str) -> str:
+        """格式化单个英雄的数据块（含无数据提示）"""
+        hero_specific_data = career.get(hero_key, {}) or {}
+        if not hero_specific_data:
             empty_msg = f"❌ 未查询到 {hero_name} 的 {gamemode_cn}模式数据"
             if gamemode == "quickplay":
                 empty_msg += f"\n💡 可尝试查询竞技模式：/ow英雄 {hero_name} 竞技"
-            yield event.plain_result(empty_msg)
-            return
+            return empty_msg
         
-        # 步骤6：数据判空与格式化
-        hero_specific_data = hero_data.get(hero_key, {}) or {}
         game_stats = hero_specific_data.get("game", {}) or {}
         total_games = game_stats.get("games_played", 0)
         combat_stats = hero_specific_data.get("combat", {}) or {}
@@ -496,22 +2521,240 @@ class OWStatsPlugin(Star):
             )
             if gamemode == "quickplay":
                 no_data_msg += f"\n💡 可尝试查询竞技模式：/ow英雄 {hero_name} 竞技"
-            yield event.plain_result(no_data_msg)
-            return
+            return no_data_msg
         elif total_games > 0 and not has_combat_data:
-            yield event.plain_result(
+            return (
                 f"✅ API请求成功（状态码200）\n"
                 f"⚠️ {tag} 使用 {hero_name} 参与{total_games}场{gamemode_cn}模式对战\n"
                 f"❌ 暂未获取到该英雄的战斗数据（可能数据未同步）"
             )
-            return
         
-        # 步骤7：输出结果
-        hero_msg = self.format_tool.format_hero_stats(hero_data, hero_name, hero_key, gamemode_cn)
-        yield event.plain_result(hero_msg)
+        return self.format_tool.format_hero_stats(career, hero_name, hero_key, gamemode_cn)
+
+    # ---------- 群排行与趋势命令 ----------
+    @filter.command("ow排行")
+    @instrumented("ow排行")
+    @admitted("ow排行", cost=LEADERBOARD_ADMISSION_COST)
+    async def ow_leaderboard(self, event: AstrMessageEvent):
+        """群排行：汇总本群已绑定账号（或指定的多个玩家）的段位并排序"""
+        args = event.message_str.strip().removeprefix("ow排行").strip().split()
+        role = None
+        platform = "pc"
+        tags = []
+        for arg in args:
+            if arg in ROLE_CN_TO_EN:
+                role = ROLE_CN_TO_EN[arg]
+            elif arg in ("pc", "console"):
+                platform = arg
+            elif "#" in arg:
+                tags.append(arg)
+            else:
+                yield event.plain_result(
+                    "参数格式错误！\n正确格式：/ow排行 [坦克/输出/支援] [pc/console] [玩家#12345 ...]\n"
+                    "不指定玩家时统计本群已绑定的账号"
+                )
+                return
+
+        if not tags:
+            self._note_group_member(event)
+            group_id = str(event.get_group_id() or "")
+            if not group_id:
+                yield event.plain_result("私聊中请指定玩家：/ow排行 玩家#12345 玩家#23456 ...")
+                return
+            tags = [self.bind_data[qq] for qq in self.group_members.get(group_id, []) if qq in self.bind_data]
+            if not tags:
+                yield event.plain_result("本群暂无已绑定账号的成员，使用 /ow绑定 玩家#12345 绑定后即可参与排行")
+                return
+        tags = list(dict.fromkeys(tags))
+        skipped = max(0, len(tags) - self.leaderboard_max_tags)
+        tags = tags[:self.leaderboard_max_tags]
+        role_label = ROLE_CN[role] if role else "最高段位"
+        yield event.plain_result(f"🔍 正在统计 {len(tags)} 名玩家的{role_label}排行（{platform}平台）...")
+
+        # 并发获取概要（信号量限制并发，命中缓存的立即返回），大批量时分段推送临时排行
+        semaphore = asyncio.Semaphore(max(1, self.leaderboard_concurrency))
+        deadline = time.monotonic() + self.leaderboard_deadline
+
+        async def fetch(tag: str) -> Tuple[str, Optional[Dict[str, Any]], str]:
+            async with semaphore:
+                summary, err_msg = await self.client.get_summary(tag, deadline=deadline)
+            return tag, summary, err_msg
+
+        tasks = [asyncio.ensure_future(fetch(tag)) for tag in tags]
+        results: Dict[str, Tuple[Optional[Dict[str, Any]], str]] = {}
+        try:
+            for done in asyncio.as_completed(tasks, timeout=self.leaderboard_deadline):
+                tag, summary, err_msg = await done
+                results[tag] = (summary, err_msg)
+                if len(tags) > LEADERBOARD_PROGRESS_STEP and len(results) % LEADERBOARD_PROGRESS_STEP == 0 \
+                        and len(results) < len(tags):
+                    # 推送已完成部分的临时排行，不把未返回的玩家计为超时
+                    done_tags = [t for t in tags if t in results]
+                    partial = self._format_leaderboard(done_tags, results, role, platform, 0)
+                    yield event.plain_result(f"⏳ 已完成 {len(results)}/{len(tags)}，临时排行：\n{partial}")
+        except asyncio.TimeoutError:
+            logger.warning(f"[OW排行] 截止时间内完成 {len(results)}/{len(tags)}")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        yield event.plain_result(self._format_leaderboard(tags, results, role, platform, skipped))
+
+    def _format_leaderboard(self, tags: List[str], results: Dict[str, Tuple[Optional[Dict[str, Any]], str]],
+                            role: Optional[str], platform: str, skipped: int) -> str:
+        """生成排行表：有段位的按段位从高到低排序，其余列在末尾"""
+        ranked = []
+        unranked = []
+        failed = []
+        for tag in tags:
+            if tag not in results:
+                failed.append(f"{tag}（超时）")
+                continue
+            summary, err_msg = results[tag]
+            if err_msg or not summary:
+                failed.append(f"{tag}（{err_msg or '无数据'}）")
+                continue
+            platform_data = (summary.get("competitive") or {}).get(platform) or {}
+            best = None
+            for role_key in ([role] if role else ["tank", "damage", "support"]):
+                role_data = platform_data.get(role_key) or {}
+                div, tier = role_data.get("division"), role_data.get("tier")
+                if div not in DIVISION_ORDER or tier is None:
+                    continue
+                score = DIVISION_ORDER[div] * 10 - tier  # 同段位内1级最高
+                if best is None or score > best[0]:
+                    best = (score, role_key, div, tier)
+            if best is None:
+                unranked.append(tag)
+            else:
+                ranked.append((best, tag))
+        ranked.sort(key=lambda item: item[0][0], reverse=True)
+
+        title = f"{ROLE_CN[role]}排行" if role else "段位排行"
+        lines = [f"🏅 {title}（{'电脑端' if platform == 'pc' else '主机端'}）"]
+        for i, ((_, role_key, div, tier), tag) in enumerate(ranked, 1):
+            role_note = "" if role else f" [{ROLE_CN[role_key]}]"
+            lines.append(f"{i}. {tag} - {DIVISION_CN.get(div, div)} {tier}{role_note}")
+        if not ranked:
+            lines.append("暂无玩家有当前赛季段位")
+        if unranked:
+            lines.append(f"未定级：{'、'.join(unranked)}")
+        if failed:
+            lines.append(f"查询失败：{'、'.join(failed)}")
+        if skipped:
+            lines.append(f"⚠️ 超出上限，另有 {skipped} 名玩家未统计")
+        return "\n".join(lines)
+
+    @filter.command("ow趋势")
+    @instrumented("ow趋势")
+    async def ow_trend(self, event: AstrMessageEvent):
+        """战绩趋势：基于本地历史快照计算变化（不请求上游）"""
+        args = event.message_str.strip().removeprefix("ow趋势").strip().split()
+        qq = str(event.get_sender_id())
+        tag = ""
+        gamemode = DEFAULT_MODE
+        platform = "pc"
+        days = TREND_DEFAULT_DAYS
+        usage = f"/ow趋势 [玩家#12345] [竞技/休闲] [pc/console] [天数]（默认{DEFAULT_MODE_CN}、pc、近{TREND_DEFAULT_DAYS}天）"
+        for arg in args:
+            if arg in MODE_CN_TO_EN:
+                gamemode = MODE_CN_TO_EN[arg]
+            elif arg in ("pc", "console"):
+                platform = arg
+            elif "#" in arg:
+                tag = arg
+            elif arg.removesuffix("天").isdigit():
+                days = min(max(int(arg.removesuffix("天")), 1), TREND_MAX_DAYS)
+            else:
+                yield event.plain_result(f"参数格式错误！\n正确格式：{usage}")
+                return
+        if not tag:
+            tag = self.bind_data.get(qq)
+            if not tag:
+                yield event.plain_result(f"请先绑定账号或指定玩家：\n{usage}")
+                return
+        history = self.client.history
+        if history is None:
+            yield event.plain_result("❌ 战绩历史记录未启用（配置项 history_enabled）")
+            return
+
+        since = time.time() - days * 86400
+        mode_rows = await history.query("mode_history", tag, gamemode, since)
+        rank_rows = await history.query("rank_history", tag, platform, since)
+        yield event.plain_result(self._format_trend(tag, gamemode, platform, days, since, mode_rows, rank_rows))
+
+    def _format_trend(self, tag: str, gamemode: str, platform: str, days: int, since: float,
+                      mode_rows: List[Tuple[Any, ...]], rank_rows: List[Tuple[Any, ...]]) -> str:
+        """生成趋势报告：区间增量、平均数据变化、段位变化与每日场次"""
+        gamemode_cn = MODE_EN_TO_CN[gamemode]
+        lines = [f"📈 【{tag}】近{days}天{gamemode_cn}趋势"]
+        if len(mode_rows) < 2:
+            lines.append("📭 历史数据不足（需至少两次不同的查询结果），多用 /ow 查询几次后再来看吧")
+        else:
+            first, last = mode_rows[0], mode_rows[-1]
+            # 基线是窗口前的最后一条快照，可能远早于窗口起点：注明实际起算日期
+            stale_baseline = first[0] < since - TREND_BASELINE_TOLERANCE
+            if stale_baseline:
+                lines[0] += f"（窗口前无近期记录，自 {time.strftime('%m-%d', time.localtime(first[0]))} 起计算）"
+            (_, gp0, gw0, kda0, elim0, deaths0, dmg0, heal0) = first
+            (_, gp1, gw1, kda1, elim1, deaths1, dmg1, heal1) = last
+            games = (gp1 or 0) - (gp0 or 0)
+            wins = (gw1 or 0) - (gw0 or 0)
+            win_rate = f"{wins / games * 100:.1f}%" if games > 0 else "-"
+            lines.append(f"🎮 新增场次: {games} | 胜场: {wins} | 区间胜率: {win_rate}")
+            lines.append(f"⚔️ KDA: {self._trend_value(kda0, kda1, 2)}")
+            lines.append(
+                f"🎯 平均 消灭: {self._trend_value(elim0, elim1, 1)} | 死亡: {self._trend_value(deaths0, deaths1, 1)}"
+            )
+            lines.append(
+                f"💥 平均 伤害: {self._trend_value(dmg0, dmg1, 0)} | 治疗: {self._trend_value(heal0, heal1, 0)}"
+            )
+            # 每日序列：取每天最后一条快照，与前一天对比得出当日场次与胜率
+            daily: Dict[str, Tuple[Any, ...]] = {}
+            for row in mode_rows:
+                daily[time.strftime("%m-%d", time.localtime(row[0]))] = row
+            # 陈旧基线与窗口内首条快照之间的差值无法归到具体某天，每日序列从窗口内首条快照起算
+            previous = next((row for row in mode_rows if row[0] >= since), last) if stale_baseline else first
+            day_lines = []
+            for day, row in daily.items():
+                if row[0] < since or row is first or row is previous:
+                    continue
+                day_games = (row[1] or 0) - (previous[1] or 0)
+                day_wins = (row[2] or 0) - (previous[2] or 0)
+                if day_games > 0:
+                    day_lines.append(f"　{day}: {day_games}场 胜率 {day_wins / day_games * 100:.0f}%")
+                previous = row
+            if day_lines:
+                lines.append("📅 每日:")
+                lines.extend(day_lines)
+        if len(rank_rows) >= 2:
+            rank_changes = []
+            for i, role in enumerate(HistoryStore.ROLES, 1):
+                before, after = rank_rows[0][i], rank_rows[-1][i]
+                if before != after:
+                    rank_changes.append(f"{ROLE_CN[role]} {self._format_rank(before)} → {self._format_rank(after)}")
+            if rank_changes:
+                lines.append(f"🏅 段位变化（{'电脑端' if platform == 'pc' else '主机端'}）: {' | '.join(rank_changes)}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _trend_value(before: Optional[float], after: Optional[float], digits: int) -> str:
+        """格式化数值变化：旧值 → 新值 (±差值)"""
+        if before is None or after is None:
+            return "-"
+        return f"{before:.{digits}f} → {after:.{digits}f} ({after - before:+.{digits}f})"
+
+    @staticmethod
+    def _format_rank(value: Optional[str]) -> str:
+        """格式化段位快照（"diamond-2" -> "钻石 2"）"""
+        if not value:
+            return "未定级"
+        div, _, tier = value.rpartition("-")
+        return f"{DIVISION_CN.get(div, div)} {tier}"
 
     # ---------- 绑定管理命令 ----------
     @filter.command("ow绑定")
+    @instrumented("ow绑定")
     async def ow_bind_account(self, event: AstrMessageEvent):
         """绑定玩家账号（提示默认休闲）"""
         arg = event.message_str.strip().removeprefix("ow绑定").strip()
@@ -523,6 +2766,7 @@ class OWStatsPlugin(Star):
         
         self.bind_data[qq] = arg
         self._save_bind_data()
+        self._note_group_member(event)
         yield event.plain_result(
             f"✅ 成功绑定账号：{arg}\n"
             f"📌 后续查询默认{DEFAULT_MODE_CN}模式：\n"
@@ -532,6 +2776,7 @@ class OWStatsPlugin(Star):
         )
 
     @filter.command("ow解绑")
+    @instrumented("ow解绑")
     async def ow_unbind_account(self, event: AstrMessageEvent):
         """解绑玩家账号"""
         qq = str(event.get_sender_id())
@@ -546,67 +2791,154 @@ class OWStatsPlugin(Star):
     # ---------- 管理员专属命令 ----------
     @filter.command("ow清理缓存")
     @filter.permission_type(PermissionType.ADMIN)
+    @instrumented("ow清理缓存")
     async def ow_clear_cache(self, event: AstrMessageEvent):
         """清理缓存（仅管理员）"""
         args = event.message_str.strip().removeprefix("ow清理缓存").strip()
-        cache_size = self.client.cache.size()
         
+        self.reply_cache.clear()
         if args == "全部":
-            self.client.cache.clear()
-            yield event.plain_result(f"✅ 已清理全部缓存（共{cache_size}条）")
+            removed = await self.client.clear_cache()
+            yield event.plain_result(f"✅ 已清理全部缓存（共{removed}条）")
         else:
-            self.client.cache.clear("players")
-            yield event.plain_result(f"✅ 已清理玩家数据缓存（共{cache_size}条）")
+            removed = await self.client.clear_cache("players")
+            yield event.plain_result(f"✅ 已清理玩家数据缓存（共{removed}条）")
 
     # ---------- 帮助与状态命令 ----------
     @filter.command("ow帮助")
+    @instrumented("ow帮助")
     async def ow_help(self, event: AstrMessageEvent):
         """显示帮助信息（默认休闲模式）"""
-        help_msg = (
-            f"🎮 守望先锋2 亚服战绩查询插件（v1.2.1）\n"
-            f"==============================\n"
-            f"📌 说明：默认查询{DEFAULT_MODE_CN}模式，可显式指定“竞技”切换\n"
-            f"🔍 基础查询：\n"
-            f"  /ow 玩家#12345 [pc/console] - 查指定玩家战绩（含竞技+休闲）\n"
-            f"  /ow - 查已绑定账号战绩\n"
-            f"\n"
-            f"🦸 英雄查询（默认{DEFAULT_MODE_CN}）：\n"
-            f"  1. 已绑定账号：/ow英雄 英雄名 [竞技/休闲]\n"
-            f"     示例：/ow英雄 源氏（默认休闲）| /ow英雄 源氏 竞技\n"
-            f"  2. 未绑定账号：/ow英雄 英雄名 玩家#12345 [竞技/休闲]\n"
-            f"     示例：/ow英雄 安娜 玩家#12345 休闲\n"
-            f"\n"
-            f"🔧 账号管理：\n"
-            f"  /ow绑定 玩家#12345 - 绑定账号\n"
-            f"  /ow解绑 - 解绑账号\n"
-            f"\n"
-            f"💡 管理员命令：\n"
-            f"  /ow清理缓存 [全部] - 清理查询缓存\n"
-            f"📌 提示：若{DEFAULT_MODE_CN}模式超时，可延长等待或切换竞技模式"
-        )
-        yield event.plain_result(help_msg)
+        yield event.plain_result(HELP_TEXT)
 
     @filter.command("ow状态")
+    @instrumented("ow状态")
     async def ow_status(self, event: AstrMessageEvent):
-        """显示插件状态（默认模式标注）"""
-        test_data, _ = await self.client.get_summary("TeKrop-2217")
-        api_status = "✅ 正常" if test_data else "❌ 异常"
+        """显示插件状态（管理员可用“/ow状态 详细”查看运行指标）"""
+        args = event.message_str.strip().removeprefix("ow状态").strip()
+        self._ensure_background_tasks()
+        api_status, health_line = self._api_health()
+        cache_stats = self.client.cache.stats()
         
         status_msg = (
             "🔧 守望先锋插件状态\n"
             "==================\n"
             f"API 连通性: {api_status}\n"
+            f"{health_line}\n"
             f"已绑定账号: {len(self.bind_data)} 个\n"
-            f"缓存数据量: {self.client.cache.size()} 条\n"
+            f"缓存数据量: {cache_stats['entries']} 条（约{cache_stats['bytes'] / 1024:.1f}KB）| 命中率: {cache_stats['hit_rate']:.1f}%\n"
             f"插件版本: v1.2.1\n"
             f"默认模式: {DEFAULT_MODE_CN}（英雄查询默认）\n"
-            f"超时配置: 60秒（减少超时概率）\n"
+            f"超时配置: 单次查询截止 {self.query_deadline:g}秒（含排队、重试与请求超时）\n"
             f"支持功能: 基础战绩查询、英雄数据查询（竞技+休闲）\n"
-            f"支持英雄数: {len(HERO_NAME_TO_KEY)} 个"
+            f"支持英雄数: {len(HERO_RESOLVER)} 个"
         )
+        if args == "详细" and event.is_admin():
+            status_msg += "\n\n" + "\n".join(self._detailed_status_lines())
         yield event.plain_result(status_msg)
 
+    def _api_health(self) -> Tuple[str, str]:
+        """根据被动健康统计判断API状态，返回 (状态, 明细行)（不发起任何请求）"""
+        health = self.client.health.stats()
+        if self.client.breaker.stats()["state"] == CircuitBreaker.OPEN:
+            status = "⛔ 熔断中"
+        elif health["last_success_ago"] is None and health["last_failure_ago"] is None:
+            status = "⏳ 暂无数据（等待首次查询或后台探测）"
+        elif health["requests"] and health["error_rate"] >= 50:
+            status = "❌ 异常"
+        elif health["requests"] and health["error_rate"] > 0:
+            status = "⚠️ 不稳定"
+        elif health["last_success_ago"] is None:
+            status = "❌ 异常"
+        else:
+            status = "✅ 正常"
+
+        def ago(seconds: Optional[float]) -> str:
+            if seconds is None:
+                return "无"
+            return f"{seconds:.0f}秒前" if seconds < 120 else f"{seconds / 60:.0f}分钟前"
+
+        line = f"最近成功: {ago(health['last_success_ago'])} | 最近失败: {ago(health['last_failure_ago'])}"
+        if health["requests"]:
+            line += (f"\n近{HEALTH_WINDOW // 60}分钟: {health['requests']} 次请求 | 错误率 {health['error_rate']:.1f}% | "
+                     f"p50 {health['p50']:.2f}秒 | p95 {health['p95']:.2f}秒")
+        return status, line
+
+    def _detailed_status_lines(self) -> List[str]:
+        """管理员详细状态：缓存/限流/熔断等组件统计与延迟指标"""
+        client = self.client
+        cache_stats = client.cache.stats()
+        limiter_stats = client.limiter.stats()
+        scheduler_stats = client.scheduler.stats()
+        negative_stats = client.negative_cache.stats()
+        breaker_stats = client.breaker.stats()
+        breaker_cn = {"closed": "✅ 关闭", "open": "⛔ 打开", "half_open": "⚠️ 半开"}[breaker_stats["state"]]
+        disk = client.disk
+        disk_status = f"已启用（回填 {disk.loads} 次 | 落盘 {disk.writes} 条）" if disk else "未启用"
+        metrics = client.metrics
+        
+        lines = [
+            "📈 运行指标（管理员）",
+            "==================",
+            f"缓存命中: {cache_stats['hits']} 次 | 陈旧命中: {cache_stats['stale_hits']} 次 | 未命中: {cache_stats['misses']} 次",
+            f"缓存淘汰: {cache_stats['evictions']} 条 | 过期清理: {cache_stats['expirations']} 条",
+            f"负缓存: {negative_stats['entries']} 条 | 拦截重复请求: {negative_stats['hits']} 次",
+            f"持久化缓存: {disk_status}",
+            f"字段裁剪: 原始 {client.raw_bytes / 1024:.1f}KB → 缓存 {client.projected_bytes / 1024:.1f}KB",
+            f"条件请求: 304续期 {client.revalidated} 次",
+            f"限流排队: {limiter_stats['waiting']} 个 | 平均等待: {limiter_stats['avg_wait']:.2f}秒 | "
+            f"最长等待: {limiter_stats['max_wait']:.2f}秒 | 超时拒绝: {limiter_stats['rejected']} 次",
+            f"请求调度: 交互 {scheduler_stats['interactive_granted']} 次 | 后台 {scheduler_stats['background_granted']} 次"
+            f"（放弃 {scheduler_stats['background_rejected']} 次）",
+            f"熔断器: {breaker_cn} | 窗口错误率: {breaker_stats['error_rate']:.1f}% | "
+            f"累计熔断: {breaker_stats['opened']} 次 | 快速失败: {breaker_stats['short_circuited']} 次",
+            f"重试预算: 拒绝重试 {client.retry_budget.denied} 次",
+            f"对冲请求: {'已启用（发出 ' + str(client.hedged) + ' 次，先返回 ' + str(client.hedge_wins) + ' 次）' if client.hedge else '未启用'}",
+            f"后台预取: {'已启用（累计 ' + str(self.prefetch_requests) + ' 次）' if self.prefetch_enabled else '未启用'}",
+        ]
+        if self.admission is not None:
+            admission_stats = self.admission.stats()
+            rejected = admission_stats["rejected"]
+            lines.append(
+                f"准入控制: 放行 {admission_stats['admitted']} 次 | 进行中 {admission_stats['inflight']} 个 | "
+                f"拒绝 重复 {rejected['duplicate']} / 未完成超限 {rejected['inflight']} / "
+                f"个人限速 {rejected['user_rate']} / 群限速 {rejected['group_rate']}"
+            )
+        
+        for labels, hist in sorted(metrics.histogram_values("owcx_upstream_request_seconds").items()):
+            lines.append(f"接口 {dict(labels)['endpoint']}: {hist.count} 次 | p50≤{hist.percentile(0.5):g}秒 | p95≤{hist.percentile(0.95):g}秒")
+        for labels, hist in sorted(metrics.histogram_values("owcx_limiter_wait_seconds").items()):
+            lines.append(f"限流等待({dict(labels)['priority']}): p50≤{hist.percentile(0.5):g}秒 | p95≤{hist.percentile(0.95):g}秒")
+        retries = {}
+        for labels, value in metrics.counter_values("owcx_retries_total").items():
+            reason = dict(labels)["reason"]
+            retries[reason] = retries.get(reason, 0) + value
+        if retries:
+            lines.append("重试原因: " + " | ".join(f"{k}: {v:g} 次" for k, v in sorted(retries.items())))
+        for labels, hist in sorted(metrics.histogram_values("owcx_command_seconds").items()):
+            lines.append(f"命令 /{dict(labels)['command']}: {hist.count} 次 | p50≤{hist.percentile(0.5):g}秒 | p95≤{hist.percentile(0.95):g}秒")
+        return lines
+
     # ---------- 内部工具方法 ----------
+    async def _fetch_sections(self, coros: Dict[str, Any], deadline: float) -> Dict[str, Tuple[Optional[Dict[str, Any]], str]]:
+        """并发执行多个数据请求，截止时间内未完成的数据块标记为超时"""
+        tasks = {name: asyncio.ensure_future(coro) for name, coro in coros.items()}
+        done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+        for task in pending:
+            task.cancel()
+        
+        results = {}
+        for name, task in tasks.items():
+            if task in done and not task.cancelled() and task.exception() is None:
+                results[name] = task.result()
+            elif task in done and not task.cancelled():
+                logger.error(f"[OW查询] 数据块 {name} 请求异常: {task.exception()}")
+                results[name] = (None, "数据获取异常，请稍后重试")
+            else:
+                logger.warning(f"[OW查询] 数据块 {name} 超过{deadline:g}秒未返回，已标记缺失")
+                results[name] = (None, SECTION_TIMEOUT_MSG)
+        return results
+
     def _parse_division_data(self, summary: Dict[str, Any], platform: str) -> List[str]:
         """解析段位数据（双重判空）"""
         competitive = summary.get("competitive", {}) or {}
@@ -643,6 +2975,8 @@ class OWStatsPlugin(Star):
 
     def _format_mode_block(self, stats: Optional[Dict[str, Any]], err_msg: str, mode_name: str) -> str:
         """格式化模式数据块"""
+        if err_msg == SECTION_TIMEOUT_MSG:
+            return f"【{mode_name}模式】\n⏱️ {err_msg}"
         if err_msg:
             return f"【{mode_name}模式】\n❌ {err_msg}"
         if not stats:
@@ -655,7 +2989,12 @@ class OWStatsPlugin(Star):
         return self.format_tool.format_mode_stats(general_stats, mode_name)
 
     async def terminate(self):
-        """插件卸载时保存数据"""
+        """插件卸载时保存数据并关闭连接池"""
         logger.info("OW2插件正在卸载，保存绑定数据...")
+        for task in self._background_tasks:
+            task.cancel()
         self._save_bind_data()
+        await self.bind_store.close()
+        await self.group_store.close()
+        await self.client.close()
         logger.info("OW2插件卸载完成")
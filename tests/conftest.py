@@ -0,0 +1,54 @@
+"""测试公共配置：将插件目录加入导入路径；未安装 AstrBot 时注入最小桩模块，使插件可在普通检出中导入"""
+import logging
+import sys
+import types
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def _install_astrbot_stub():
+    """仅提供插件导入时用到的 astrbot.api 名称（装饰器原样返回被装饰对象）"""
+    class Star:
+        def __init__(self, context=None):
+            self.context = context
+
+    class AstrMessageEvent:
+        pass
+
+    class PermissionType:
+        ADMIN = "admin"
+        MEMBER = "member"
+
+    class Plain:
+        def __init__(self, text: str):
+            self.text = text
+
+    class _Filter:
+        def command(self, *args, **kwargs):
+            return lambda func: func
+
+        def permission_type(self, *args, **kwargs):
+            return lambda func: func
+
+    def register(*args, **kwargs):
+        return lambda cls: cls
+
+    modules = {
+        "astrbot": {},
+        "astrbot.api": {"logger": logging.getLogger("astrbot")},
+        "astrbot.api.star": {"Star": Star, "register": register},
+        "astrbot.api.event": {"filter": _Filter(), "AstrMessageEvent": AstrMessageEvent},
+        "astrbot.api.event.filter": {"PermissionType": PermissionType},
+        "astrbot.api.message_components": {"Plain": Plain},
+    }
+    for name, attrs in modules.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attrs)
+        sys.modules[name] = module
+
+
+try:
+    import astrbot.api  # noqa: F401
+except ImportError:
+    _install_astrbot_stub()
@@ -0,0 +1,29 @@
+"""单飞合并：同一玩家的并发查询只触发一次上游请求"""
+import asyncio
+
+import main as plugin_main
+from bench.mock_server import MockOverfast, start_server
+
+CONCURRENT_CALLS = 20
+TAG = "Coalesce-1234"
+
+
+async def _concurrent_summaries(mock: MockOverfast):
+    runner, base_url = await start_server(mock)
+    client = plugin_main.OWAPIClient(api_base=base_url)
+    try:
+        return await asyncio.gather(*(client.get_summary(TAG) for _ in range(CONCURRENT_CALLS)))
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def test_concurrent_get_summary_coalesces_to_one_upstream_call():
+    mock = MockOverfast(latency=0.2, jitter=0.0)
+    results = asyncio.run(_concurrent_summaries(mock))
+
+    assert mock.total_calls == 1
+    assert len(results) == CONCURRENT_CALLS
+    for data, err in results:
+        assert not err
+        assert data is not None
@@ -0,0 +1,48 @@
+"""限流器：排队者放弃或冻结顺延后仍按到达顺序、每1/rate放行一个"""
+import asyncio
+import time
+
+import main as plugin_main
+
+
+async def _acquire_all(limiter: plugin_main.RateLimiter, count: int, timeout: float = 30):
+    started = time.monotonic()
+    grants = {}
+
+    async def waiter(i: int):
+        ok = await limiter.acquire(timeout=timeout)
+        grants[i] = (round(time.monotonic() - started, 1), ok)
+
+    tasks = [asyncio.ensure_future(waiter(i)) for i in range(count)]
+    return tasks, grants
+
+
+def test_cancelled_waiter_hands_slot_to_queue():
+    async def scenario():
+        limiter = plugin_main.RateLimiter(rate=5, burst=1)
+        tasks, grants = await _acquire_all(limiter, 5)
+        await asyncio.sleep(0.05)
+        tasks[2].cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return grants
+
+    grants = asyncio.run(scenario())
+    assert [grants[i] for i in (0, 1, 3, 4)] == [(0.0, True), (0.2, True), (0.4, True), (0.6, True)]
+
+
+def test_freeze_rejects_waiters_past_deadline_immediately():
+    async def scenario():
+        limiter = plugin_main.RateLimiter(rate=5, burst=1)
+        tasks, grants = await _acquire_all(limiter, 3, timeout=1.0)
+        await asyncio.sleep(0.05)
+        limiter.freeze(5)
+        await asyncio.sleep(0.02)
+        for task in tasks:
+            task.cancel()
+        return grants
+
+    grants = asyncio.run(scenario())
+    for i in (1, 2):
+        waited, ok = grants[i]
+        assert not ok
+        assert waited < 0.2